@@ -1,30 +1,75 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import pandas as pd
-import joblib
 import os
-import numpy as np
+import hmac
+from functools import wraps
+from config import Config
+from scoring import model, scaler, drift_monitor, drift_report, score_transaction, share_drift_state
+from bson.objectid import ObjectId
+from auth import token_required
+from database import create_transaction, get_transaction_by_id, create_fraud_alert, update_transaction_status
+from otp_service import send_otp, verify_otp
+from profiler import RequestProfiler, ProfilerStateSync, format_collapsed
 
 app = Flask(__name__)
 CORS(app)  # Allow requests from frontend and backend
 
-# Load trained model
-model_path = os.path.join("models", "paywatch_model.pkl")
-try:
-    model = joblib.load(model_path)
-    print("✅ Model loaded successfully")
-except Exception as e:
-    print(f"❌ Error loading model: {e}")
-    model = None
-
-# Load saved scaler
-scaler_path = os.path.join("models", "scaler.pkl")
-try:
-    scaler = joblib.load(scaler_path)
-    print("✅ Scaler loaded successfully")
-except Exception as e:
-    print(f"❌ Error loading scaler: {e}")
-    scaler = None
+# Workers of this server merge their drift state through DRIFT_STATE_DIR/flask
+share_drift_state("flask")
+
+# Request profiler, switched on at runtime through /admin/profiling
+profiler = RequestProfiler(
+    enabled=Config.PROFILING_ENABLED,
+    sample_rate=Config.PROFILING_SAMPLE_RATE
+)
+PROFILED_ENDPOINTS = {"predict", "predict_batch", "record_transaction", "verify_transaction_otp"}
+
+# Share profiler settings and results between workers through PROFILING_STATE_DIR
+if Config.PROFILING_STATE_DIR:
+    profiler_sync = ProfilerStateSync(profiler, Config.PROFILING_STATE_DIR, Config.PROFILING_SYNC_SECONDS)
+else:
+    profiler_sync = None
+
+@app.before_request
+def start_profiling():
+    if profiler_sync is not None:
+        profiler_sync.ensure_started()
+    if profiler.enabled and request.endpoint in PROFILED_ENDPOINTS:
+        g.profile = profiler.start_request(f"{request.method} {request.path}")
+
+@app.after_request
+def record_profile_status(response):
+    if g.get("profile") is not None:
+        g.profile_status = response.status_code
+    return response
+
+@app.teardown_request
+def finish_profiling(exc):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profiler.finish_request(profile, g.pop("profile_status", None))
+
+def profiling_results():
+    """Profiling results covering every worker that published them"""
+    if profiler_sync is None:
+        return profiler.get_state(), 1
+
+    return profiler_sync.merged()
+
+def admin_required(f):
+    """Decorator to protect admin routes with the X-Admin-Token header"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not Config.ADMIN_TOKEN:
+            return jsonify({"error": "Admin endpoints are disabled, ADMIN_TOKEN is not set"}), 403
+
+        provided = request.headers.get("X-Admin-Token", "")
+        if not hmac.compare_digest(provided.encode(), Config.ADMIN_TOKEN.encode()):
+            return jsonify({"error": "Invalid admin token"}), 401
+
+        return f(*args, **kwargs)
+
+    return decorated
 
 # Health check endpoint
 @app.route("/health", methods=["GET"])
@@ -33,7 +78,8 @@ def health():
         "status": "OK",
         "message": "PayWatch ML Service is running",
         "model_loaded": model is not None,
-        "scaler_loaded": scaler is not None
+        "scaler_loaded": scaler is not None,
+        "drift_monitoring": drift_monitor is not None
     })
 
 # Prediction route
@@ -56,31 +102,9 @@ def predict():
             }), 400
 
         # Only use Amount and Time
-        df = pd.DataFrame([{
-            "Amount": float(data["Amount"]),
-            "Time": float(data["Time"])
-        }])
-
-        # Scale numeric features
-        df[["Amount", "Time"]] = scaler.transform(df[["Amount", "Time"]])
-
-        # Predict fraud
-        prediction = int(model.predict(df)[0])
-        
-        # Get fraud probability score
-        try:
-            fraud_proba = model.predict_proba(df)[0]
-            fraud_score = float(fraud_proba[1])  # Probability of fraud (class 1)
-        except:
-            # If model doesn't support predict_proba, use a simple heuristic
-            fraud_score = 0.85 if prediction == 1 else 0.15
+        result = score_transaction(float(data["Amount"]), float(data["Time"]), profiler)
 
-        return jsonify({
-            "prediction": prediction,
-            "fraud_score": round(fraud_score, 4),
-            "status": "fraud" if prediction == 1 else "legitimate",
-            "confidence": round(max(fraud_proba) if 'fraud_proba' in locals() else 0.85, 4)
-        })
+        return jsonify(result)
 
     except Exception as e:
         return jsonify({
@@ -108,24 +132,11 @@ def predict_batch():
 
         results = []
         for txn in transactions:
-            df = pd.DataFrame([{
-                "Amount": float(txn["Amount"]),
-                "Time": float(txn["Time"])
-            }])
-
-            df[["Amount", "Time"]] = scaler.transform(df[["Amount", "Time"]])
-            prediction = int(model.predict(df)[0])
-            
-            try:
-                fraud_proba = model.predict_proba(df)[0]
-                fraud_score = float(fraud_proba[1])
-            except:
-                fraud_score = 0.85 if prediction == 1 else 0.15
-
+            result = score_transaction(float(txn["Amount"]), float(txn["Time"]), profiler)
             results.append({
-                "prediction": prediction,
-                "fraud_score": round(fraud_score, 4),
-                "status": "fraud" if prediction == 1 else "legitimate"
+                "prediction": result["prediction"],
+                "fraud_score": result["fraud_score"],
+                "status": result["status"]
             })
 
         return jsonify({
@@ -138,6 +149,111 @@ def predict_batch():
             "error": str(e)
         }), 500
 
+# Score and store a transaction for the signed-in user; flagged ones get a
+# fraud alert and an OTP sent to the user's own email
+@app.route("/transactions", methods=["POST"])
+@token_required
+def record_transaction():
+    try:
+        if model is None or scaler is None:
+            return jsonify({
+                "error": "Model or scaler not loaded"
+            }), 500
+
+        data = request.json
+
+        # Validate input
+        if "Amount" not in data or "Time" not in data:
+            return jsonify({
+                "error": "Amount and Time are required fields"
+            }), 400
+
+        amount = float(data["Amount"])
+        time = float(data["Time"])
+        result = score_transaction(amount, time, profiler)
+
+        with profiler.stage("db"):
+            transaction_id = create_transaction(
+                request.user_id, amount, time, result["prediction"], result["fraud_score"],
+                device_info=data.get("device_info"), location=data.get("location")
+            )
+
+        otp_sent = False
+        if result["prediction"] == 1:
+            with profiler.stage("db"):
+                create_fraud_alert(transaction_id, request.user_id, result["fraud_score"])
+            with profiler.stage("otp"):
+                otp_sent = send_otp(request.user_email, amount, transaction_id)
+
+        return jsonify({
+            "transaction_id": transaction_id,
+            **result,
+            "otp_sent": otp_sent
+        }), 201
+
+    except Exception as e:
+        return jsonify({
+            "error": str(e)
+        }), 500
+
+# Verify the OTP for one of the signed-in user's flagged transactions
+@app.route("/transactions/<transaction_id>/verify-otp", methods=["POST"])
+@token_required
+def verify_transaction_otp(transaction_id):
+    try:
+        data = request.json
+
+        if "otp" not in data:
+            return jsonify({
+                "error": "otp is a required field"
+            }), 400
+
+        # Check the transaction before the OTP is used up
+        if not ObjectId.is_valid(transaction_id):
+            return jsonify({
+                "error": "Invalid transaction id"
+            }), 400
+
+        with profiler.stage("db"):
+            transaction = get_transaction_by_id(transaction_id)
+
+        if transaction is None:
+            return jsonify({
+                "error": "Transaction not found"
+            }), 404
+
+        if transaction["user_id"] != request.user_id:
+            return jsonify({
+                "error": "Transaction does not belong to this user"
+            }), 403
+
+        if transaction["status"] != "flagged":
+            return jsonify({
+                "error": "Transaction is not awaiting verification"
+            }), 400
+
+        with profiler.stage("db"):
+            verified = verify_otp(request.user_email, data["otp"], transaction_id)
+            if verified:
+                update_transaction_status(transaction_id, "verified")
+
+        if not verified:
+            return jsonify({
+                "verified": False,
+                "error": "Invalid or expired OTP"
+            }), 400
+
+        return jsonify({
+            "verified": True,
+            "transaction_id": transaction_id,
+            "status": "verified"
+        })
+
+    except Exception as e:
+        return jsonify({
+            "error": str(e)
+        }), 500
+
 # Model info endpoint
 @app.route("/model-info", methods=["GET"])
 def model_info():
@@ -154,6 +270,80 @@ def model_info():
             "error": str(e)
         }), 500
 
+# Drift report endpoint
+@app.route("/drift", methods=["GET"])
+def drift():
+    if drift_monitor is None:
+        return jsonify({
+            "error": "Drift monitoring is not enabled, reference profile not loaded"
+        }), 503
+
+    return jsonify(drift_report())
+
+# Raw sketch state of this worker
+@app.route("/drift/state", methods=["GET"])
+def drift_state():
+    if drift_monitor is None:
+        return jsonify({
+            "error": "Drift monitoring is not enabled, reference profile not loaded"
+        }), 503
+
+    return jsonify(drift_monitor.get_state())
+
+# Profiling status and the slowest profiled requests
+@app.route("/admin/profiling", methods=["GET"])
+@admin_required
+def profiling_status():
+    results, workers = profiling_results()
+    return jsonify({
+        **profiler.settings(),
+        "profiled_requests": results["profiled_requests"],
+        "distinct_stacks": len(results["stacks"]),
+        "total_samples": sum(results["stacks"].values()),
+        "workers": workers,
+        "slowest_requests": results["slowest"]
+    })
+
+# Switch profiling on/off and tune it at runtime
+@app.route("/admin/profiling", methods=["POST"])
+@admin_required
+def configure_profiling():
+    try:
+        data = request.json or {}
+
+        # Start from the latest shared settings so fields left out keep their values
+        if profiler_sync is not None:
+            profiler_sync.load_settings()
+
+        profiler.configure(
+            enabled=data.get("enabled"),
+            sample_rate=data.get("sample_rate"),
+            interval_ms=data.get("interval_ms"),
+            slow_requests=data.get("slow_requests")
+        )
+
+        reset = data.get("reset") is True
+        if reset:
+            profiler.reset()
+
+        # Other workers apply the new settings within PROFILING_SYNC_SECONDS
+        if profiler_sync is not None:
+            profiler_sync.save_settings(reset=reset)
+
+        return jsonify(profiler.settings())
+
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            "error": str(e)
+        }), 400
+
+# Aggregated samples in collapsed-stack format for flamegraph.pl / speedscope
+@app.route("/admin/profiling/flamegraph", methods=["GET"])
+@admin_required
+def profiling_flamegraph():
+    results, _ = profiling_results()
+    return Response(format_collapsed(results["stacks"]), mimetype="text/plain")
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5001))
     app.run(debug=True, host="0.0.0.0", port=port)
@@ -0,0 +1,285 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from bson.objectid import ObjectId
+from quart import Quart, g, request, jsonify
+from quart_cors import cors
+from config import Config
+from tokens import decode_token
+# Model, scaler, drift monitor and scoring are shared with the Flask service
+from scoring import model, scaler, drift_monitor, drift_report, score_transaction, share_drift_state
+from async_database import create_transaction, get_transaction_by_id, create_fraud_alert, update_transaction_status
+from async_otp_service import send_otp, verify_otp
+
+# Async serving mode: Mongo and SMTP calls are awaited on the event loop and
+# model inference runs in a thread pool, so a worker can hold many requests
+# that are waiting on the network. Run with:
+#   hypercorn asgi_app:app --bind 0.0.0.0:5001
+app = Quart(__name__)
+app = cors(app, allow_origin=Config.CORS_ORIGINS)
+
+# Workers of this server merge their drift state through DRIFT_STATE_DIR/asgi
+share_drift_state("asgi")
+
+inference_executor = ThreadPoolExecutor(
+    max_workers=Config.INFERENCE_WORKERS,
+    thread_name_prefix="inference"
+)
+
+async def run_inference(func, *args):
+    """Run CPU-bound scoring off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_executor, func, *args)
+
+def token_required(f):
+    """Async counterpart of auth.token_required; sets g.user_id and g.user_email"""
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        token = None
+
+        # Get token from Authorization header
+        if 'Authorization' in request.headers:
+            try:
+                token = request.headers['Authorization'].split(" ")[1]  # Bearer <token>
+            except IndexError:
+                return jsonify({'error': 'Invalid token format'}), 401
+
+        if not token:
+            return jsonify({'error': 'Token is missing'}), 401
+
+        payload = decode_token(token)
+
+        if not payload:
+            return jsonify({'error': 'Token is invalid or expired'}), 401
+
+        g.user_id = payload['user_id']
+        g.user_email = payload['email']
+
+        return await f(*args, **kwargs)
+
+    return decorated
+
+def score_batch(transactions):
+    return [score_transaction(float(txn["Amount"]), float(txn["Time"])) for txn in transactions]
+
+@app.after_serving
+async def shutdown_executor():
+    inference_executor.shutdown(wait=False)
+
+# Health check endpoint
+@app.route("/health", methods=["GET"])
+async def health():
+    return jsonify({
+        "status": "OK",
+        "message": "PayWatch ML Service is running (async)",
+        "model_loaded": model is not None,
+        "scaler_loaded": scaler is not None,
+        "drift_monitoring": drift_monitor is not None
+    })
+
+# Prediction route
+@app.route("/predict", methods=["POST"])
+async def predict():
+    try:
+        if model is None or scaler is None:
+            return jsonify({
+                "error": "Model or scaler not loaded",
+                "prediction": 0,
+                "fraud_score": 0.0
+            }), 500
+
+        data = await request.get_json()
+
+        # Validate input
+        if "Amount" not in data or "Time" not in data:
+            return jsonify({
+                "error": "Amount and Time are required fields"
+            }), 400
+
+        result = await run_inference(score_transaction, float(data["Amount"]), float(data["Time"]))
+
+        return jsonify(result)
+
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "prediction": 0,
+            "fraud_score": 0.0
+        }), 500
+
+# Batch prediction endpoint
+@app.route("/predict-batch", methods=["POST"])
+async def predict_batch():
+    try:
+        if model is None or scaler is None:
+            return jsonify({
+                "error": "Model or scaler not loaded"
+            }), 500
+
+        data = await request.get_json()
+        transactions = data.get("transactions", [])
+
+        if not transactions:
+            return jsonify({
+                "error": "No transactions provided"
+            }), 400
+
+        scored = await run_inference(score_batch, transactions)
+        results = [{
+            "prediction": result["prediction"],
+            "fraud_score": result["fraud_score"],
+            "status": result["status"]
+        } for result in scored]
+
+        return jsonify({
+            "results": results,
+            "total": len(results)
+        })
+
+    except Exception as e:
+        return jsonify({
+            "error": str(e)
+        }), 500
+
+# Score and store a transaction for the signed-in user; flagged ones get a
+# fraud alert and an OTP sent to the user's own email
+@app.route("/transactions", methods=["POST"])
+@token_required
+async def record_transaction():
+    try:
+        if model is None or scaler is None:
+            return jsonify({
+                "error": "Model or scaler not loaded"
+            }), 500
+
+        data = await request.get_json()
+
+        # Validate input
+        if "Amount" not in data or "Time" not in data:
+            return jsonify({
+                "error": "Amount and Time are required fields"
+            }), 400
+
+        amount = float(data["Amount"])
+        time = float(data["Time"])
+        result = await run_inference(score_transaction, amount, time)
+
+        transaction_id = await create_transaction(
+            g.user_id, amount, time, result["prediction"], result["fraud_score"],
+            device_info=data.get("device_info"), location=data.get("location")
+        )
+
+        otp_sent = False
+        if result["prediction"] == 1:
+            # Alert insert and OTP delivery are independent, so run them together
+            _, otp_sent = await asyncio.gather(
+                create_fraud_alert(transaction_id, g.user_id, result["fraud_score"]),
+                send_otp(g.user_email, amount, transaction_id)
+            )
+
+        return jsonify({
+            "transaction_id": transaction_id,
+            **result,
+            "otp_sent": otp_sent
+        }), 201
+
+    except Exception as e:
+        return jsonify({
+            "error": str(e)
+        }), 500
+
+# Verify the OTP for one of the signed-in user's flagged transactions
+@app.route("/transactions/<transaction_id>/verify-otp", methods=["POST"])
+@token_required
+async def verify_transaction_otp(transaction_id):
+    try:
+        data = await request.get_json()
+
+        if "otp" not in data:
+            return jsonify({
+                "error": "otp is a required field"
+            }), 400
+
+        # Check the transaction before the OTP is used up
+        if not ObjectId.is_valid(transaction_id):
+            return jsonify({
+                "error": "Invalid transaction id"
+            }), 400
+
+        transaction = await get_transaction_by_id(transaction_id)
+
+        if transaction is None:
+            return jsonify({
+                "error": "Transaction not found"
+            }), 404
+
+        if transaction["user_id"] != g.user_id:
+            return jsonify({
+                "error": "Transaction does not belong to this user"
+            }), 403
+
+        if transaction["status"] != "flagged":
+            return jsonify({
+                "error": "Transaction is not awaiting verification"
+            }), 400
+
+        verified = await verify_otp(g.user_email, data["otp"], transaction_id)
+        if not verified:
+            return jsonify({
+                "verified": False,
+                "error": "Invalid or expired OTP"
+            }), 400
+
+        await update_transaction_status(transaction_id, "verified")
+
+        return jsonify({
+            "verified": True,
+            "transaction_id": transaction_id,
+            "status": "verified"
+        })
+
+    except Exception as e:
+        return jsonify({
+            "error": str(e)
+        }), 500
+
+# Model info endpoint
+@app.route("/model-info", methods=["GET"])
+async def model_info():
+    return jsonify({
+        "model_type": "XGBoost Classifier",
+        "features": ["Amount", "Time"],
+        "model_loaded": model is not None,
+        "scaler_loaded": scaler is not None,
+        "version": "1.0.0"
+    })
+
+# Drift report endpoint
+@app.route("/drift", methods=["GET"])
+async def drift():
+    if drift_monitor is None:
+        return jsonify({
+            "error": "Drift monitoring is not enabled, reference profile not loaded"
+        }), 503
+
+    # Merging published worker states reads files, keep it off the event loop
+    return jsonify(await asyncio.to_thread(drift_report))
+
+# Raw sketch state of this worker
+@app.route("/drift/state", methods=["GET"])
+async def drift_state():
+    if drift_monitor is None:
+        return jsonify({
+            "error": "Drift monitoring is not enabled, reference profile not loaded"
+        }), 503
+
+    return jsonify(drift_monitor.get_state())
+
+if __name__ == "__main__":
+    import hypercorn.asyncio
+    from hypercorn.config import Config as HypercornConfig
+
+    hypercorn_config = HypercornConfig()
+    hypercorn_config.bind = [f"0.0.0.0:{int(os.environ.get('PORT', 5001))}"]
+    asyncio.run(hypercorn.asyncio.serve(app, hypercorn_config))
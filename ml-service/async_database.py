@@ -0,0 +1,88 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson.objectid import ObjectId
+from datetime import datetime
+from config import Config
+
+# Non-blocking counterparts of the database.py functions used by asgi_app.py.
+# Documents are written with the same shape, so both servers share the data.
+
+# Initialize async MongoDB client (binds to the running event loop on first use)
+client = AsyncIOMotorClient(Config.MONGODB_URI)
+db = client.paywatch
+
+# Collections
+transactions_collection = db.transactions
+fraud_alerts_collection = db.fraud_alerts
+otp_collection = db.otps
+
+# Transaction Model Functions
+async def create_transaction(user_id, amount, time, prediction, fraud_score, device_info=None, location=None):
+    """Create a new transaction record"""
+    transaction = {
+        "user_id": user_id,
+        "amount": amount,
+        "time": time,
+        "timestamp": datetime.utcnow(),
+        "prediction": prediction,
+        "fraud_score": fraud_score,
+        "status": "flagged" if prediction == 1 else "approved",
+        "device_info": device_info,
+        "location": location,
+        "verified": False
+    }
+
+    result = await transactions_collection.insert_one(transaction)
+    return str(result.inserted_id)
+
+async def get_transaction_by_id(transaction_id):
+    """Get transaction by ID"""
+    return await transactions_collection.find_one({"_id": ObjectId(transaction_id)})
+
+async def update_transaction_status(transaction_id, status, verified=True):
+    """Update transaction status after verification"""
+    await transactions_collection.update_one(
+        {"_id": ObjectId(transaction_id)},
+        {"$set": {"status": status, "verified": verified, "verified_at": datetime.utcnow()}}
+    )
+
+# Fraud Alert Model Functions
+async def create_fraud_alert(transaction_id, user_id, risk_score):
+    """Create a fraud alert for flagged transaction"""
+    alert = {
+        "transaction_id": transaction_id,
+        "user_id": user_id,
+        "risk_score": risk_score,
+        "flagged_at": datetime.utcnow(),
+        "status": "pending",
+        "reviewed_by": None,
+        "reviewed_at": None
+    }
+
+    result = await fraud_alerts_collection.insert_one(alert)
+    return str(result.inserted_id)
+
+# OTP Model Functions
+async def create_otp(email, otp_code, transaction_id=None):
+    """Store OTP for email verification, optionally bound to a transaction"""
+    otp_doc = {
+        "email": email,
+        "otp": otp_code,
+        "transaction_id": transaction_id,
+        "created_at": datetime.utcnow(),
+        "used": False
+    }
+
+    # Delete any existing OTPs for this email
+    await otp_collection.delete_many({"email": email})
+
+    result = await otp_collection.insert_one(otp_doc)
+    return str(result.inserted_id)
+
+async def verify_otp(email, otp_code, transaction_id=None):
+    """Verify OTP code and mark it as used (atomic, see database.verify_otp)"""
+    query = {"email": email, "otp": otp_code, "used": False}
+    if transaction_id is not None:
+        query["transaction_id"] = transaction_id
+
+    otp_doc = await otp_collection.find_one_and_update(query, {"$set": {"used": True}})
+    return otp_doc is not None
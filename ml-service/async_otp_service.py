@@ -0,0 +1,46 @@
+import aiosmtplib
+from config import Config
+from async_database import create_otp, verify_otp as db_verify_otp
+from otp_message import generate_otp, build_otp_message, smtp_configured
+
+# Non-blocking counterparts of the otp_service.py functions used by asgi_app.py
+
+async def send_otp_email(email, otp_code, transaction_amount=None):
+    """Send OTP via email without blocking the event loop"""
+    try:
+        msg = build_otp_message(email, otp_code, transaction_amount)
+
+        if smtp_configured():
+            await aiosmtplib.send(
+                msg,
+                hostname=Config.SMTP_HOST,
+                port=Config.SMTP_PORT,
+                start_tls=Config.SMTP_USE_TLS,
+                username=Config.SMTP_USER if Config.SMTP_PASSWORD else None,
+                password=Config.SMTP_PASSWORD or None
+            )
+
+            print(f"✅ OTP sent to {email}")
+            return True
+        else:
+            # For development without SMTP configured
+            print(f"⚠️ SMTP not configured. OTP for {email}: {otp_code}")
+            return True
+
+    except Exception as e:
+        print(f"❌ Error sending OTP email: {str(e)}")
+        return False
+
+async def send_otp(email, transaction_amount=None, transaction_id=None):
+    """Generate and send OTP"""
+    otp_code = generate_otp()
+
+    # Store OTP in database
+    await create_otp(email, otp_code, transaction_id)
+
+    # Send email
+    return await send_otp_email(email, otp_code, transaction_amount)
+
+async def verify_otp(email, otp_code, transaction_id=None):
+    """Verify OTP code"""
+    return await db_verify_otp(email, otp_code, transaction_id)
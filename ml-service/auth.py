@@ -1,32 +1,10 @@
-import jwt
-from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
 from config import Config
 from database import find_user_by_email
 from bson.objectid import ObjectId
-
-def generate_token(user_id, email):
-    """Generate JWT token for user"""
-    payload = {
-        'user_id': str(user_id),
-        'email': email,
-        'exp': datetime.utcnow() + timedelta(hours=Config.JWT_EXPIRATION_HOURS),
-        'iat': datetime.utcnow()
-    }
-    
-    token = jwt.encode(payload, Config.JWT_SECRET, algorithm='HS256')
-    return token
-
-def decode_token(token):
-    """Decode and verify JWT token"""
-    try:
-        payload = jwt.decode(token, Config.JWT_SECRET, algorithms=['HS256'])
-        return payload
-    except jwt.ExpiredSignatureError:
-        return None
-    except jwt.InvalidTokenError:
-        return None
+# Token helpers live in tokens.py so the ASGI server can use them without Flask
+from tokens import generate_token, decode_token
 
 def token_required(f):
     """Decorator to protect routes with JWT authentication"""
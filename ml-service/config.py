@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,6 +17,7 @@ class Config:
     SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
     SMTP_USER = os.getenv('SMTP_USER', '')
     SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
+    SMTP_USE_TLS = os.getenv('SMTP_USE_TLS', 'True') == 'True'
     
     # Flask Configuration
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
@@ -23,3 +25,21 @@ class Config:
     
     # CORS Configuration
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')
+    
+    # Drift Monitoring Configuration (set DRIFT_STATE_DIR empty to disable sharing between workers)
+    DRIFT_STATE_DIR = os.getenv('DRIFT_STATE_DIR', os.path.join(tempfile.gettempdir(), 'paywatch-drift'))
+    DRIFT_PUBLISH_SECONDS = int(os.getenv('DRIFT_PUBLISH_SECONDS', 10))
+    
+    # Admin Configuration (profiling endpoints are disabled when no token is set)
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    
+    # Request Profiling Configuration
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+    PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 1.0))
+    # Settings and results are shared between workers through this directory
+    # (set it empty to profile the answering worker only)
+    PROFILING_STATE_DIR = os.getenv('PROFILING_STATE_DIR', os.path.join(tempfile.gettempdir(), 'paywatch-profiling'))
+    PROFILING_SYNC_SECONDS = int(os.getenv('PROFILING_SYNC_SECONDS', 2))
+    
+    # ASGI Serving Configuration (asgi_app.py)
+    INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', os.cpu_count() or 1))
@@ -30,12 +30,20 @@ def init_db():
     fraud_alerts_collection.create_index([("user_id", ASCENDING)])
     fraud_alerts_collection.create_index([("flagged_at", DESCENDING)])
     
+    ensure_label_indexes()
+    
     # OTP indexes with TTL (expire after 5 minutes)
     otp_collection.create_index([("created_at", ASCENDING)], expireAfterSeconds=300)
     otp_collection.create_index([("email", ASCENDING)])
     
     print("✅ Database indexes created successfully")
 
+# Label indexes, also created by refresh_model.py before it streams labels
+def ensure_label_indexes():
+    """Create the verified_at indexes used by the label streams (idempotent)"""
+    transactions_collection.create_index([("verified_at", ASCENDING)])
+    fraud_alerts_collection.create_index([("verified_at", ASCENDING)])
+
 # User Model Functions
 def create_user(username, email, password):
     """Create a new user with hashed password"""
@@ -116,6 +124,13 @@ def get_transaction_by_id(transaction_id):
     from bson.objectid import ObjectId
     return transactions_collection.find_one({"_id": ObjectId(transaction_id)})
 
+def get_transactions_by_ids(transaction_ids):
+    """Get transactions for a list of IDs"""
+    from bson.objectid import ObjectId
+    return list(transactions_collection.find(
+        {"_id": {"$in": [ObjectId(tid) for tid in transaction_ids]}}
+    ))
+
 def update_transaction_status(transaction_id, status, verified=True):
     """Update transaction status after verification"""
     from bson.objectid import ObjectId
@@ -164,9 +179,11 @@ def get_fraud_alerts(user_id=None, status=None, page=1, limit=20):
 def update_alert_status(alert_id, status, reviewed_by=None):
     """Update fraud alert status"""
     from bson.objectid import ObjectId
+    now = datetime.utcnow()
     update_data = {
         "status": status,
-        "reviewed_at": datetime.utcnow()
+        "reviewed_at": now,
+        "verified_at": now
     }
     
     if reviewed_by:
@@ -177,12 +194,49 @@ def update_alert_status(alert_id, status, reviewed_by=None):
         {"$set": update_data}
     )
 
+# Label Stream Functions
+def _verified_range(since, until):
+    """Build a verified_at range filter for label streams"""
+    verified_at = {"$exists": True}
+    if since:
+        verified_at["$gt"] = since
+    if until:
+        verified_at["$lte"] = until
+    return {"verified_at": verified_at}
+
+def stream_verified_transactions(since=None, until=None, batch_size=1000):
+    """Stream transactions verified in (since, until], oldest first, via the verified_at index"""
+    query = _verified_range(since, until)
+    cursor = (transactions_collection.find(query)
+              .sort("verified_at", ASCENDING)
+              .batch_size(batch_size))
+    for transaction in cursor:
+        yield transaction
+
+def stream_reviewed_alerts(since=None, until=None, batch_size=1000):
+    """Stream fraud alerts reviewed in (since, until], oldest first, via the verified_at index"""
+    query = _verified_range(since, until)
+    cursor = (fraud_alerts_collection.find(query)
+              .sort("verified_at", ASCENDING)
+              .batch_size(batch_size))
+    for alert in cursor:
+        yield alert
+
+def get_reviewed_alerts(transaction_ids, statuses):
+    """Get reviewed alerts with one of `statuses` for the given transactions, oldest review first"""
+    return list(fraud_alerts_collection.find({
+        "transaction_id": {"$in": list(transaction_ids)},
+        "status": {"$in": list(statuses)},
+        "verified_at": {"$exists": True}
+    }).sort("verified_at", ASCENDING))
+
 # OTP Model Functions
-def create_otp(email, otp_code):
-    """Store OTP for email verification"""
+def create_otp(email, otp_code, transaction_id=None):
+    """Store OTP for email verification, optionally bound to a transaction"""
     otp_doc = {
         "email": email,
         "otp": otp_code,
+        "transaction_id": transaction_id,
         "created_at": datetime.utcnow(),
         "used": False
     }
@@ -193,23 +247,19 @@ def create_otp(email, otp_code):
     result = otp_collection.insert_one(otp_doc)
     return str(result.inserted_id)
 
-def verify_otp(email, otp_code):
-    """Verify OTP code"""
-    otp_doc = otp_collection.find_one({
-        "email": email,
-        "otp": otp_code,
-        "used": False
-    })
-    
-    if otp_doc:
-        # Mark OTP as used
-        otp_collection.update_one(
-            {"_id": otp_doc["_id"]},
-            {"$set": {"used": True}}
-        )
-        return True
-    
-    return False
+def verify_otp(email, otp_code, transaction_id=None):
+    """Verify OTP code and mark it as used
+
+    Lookup and update are a single atomic operation, so an OTP is accepted
+    at most once even under concurrent requests. With transaction_id set,
+    only an OTP issued for that transaction matches.
+    """
+    query = {"email": email, "otp": otp_code, "used": False}
+    if transaction_id is not None:
+        query["transaction_id"] = transaction_id
+    
+    otp_doc = otp_collection.find_one_and_update(query, {"$set": {"used": True}})
+    return otp_doc is not None
 
 # Analytics Functions
 def get_transaction_stats(user_id=None):
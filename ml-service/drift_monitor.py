@@ -0,0 +1,422 @@
+import glob
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+import numpy as np
+
+# Features watched on the input side; values are recorded unscaled
+MONITORED_FEATURES = ["Amount", "Time"]
+SCORE_FEATURE = "fraud_score"
+
+# Sketch settings: 1% relative accuracy over roughly 1e-9 .. 6e8
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_NUM_BINS = 2048
+SKETCH_MIN_VALUE = 1e-9
+
+# Reference profile settings
+REFERENCE_HISTOGRAM_BINS = 10
+REFERENCE_QUANTILES = [i / 100 for i in range(1, 100)]
+
+# PSI below 0.1 is stable, 0.1-0.25 is a moderate shift, above 0.25 is significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+PSI_EPSILON = 1e-6
+
+# Workers publish their state this often; files older than a few intervals
+# belong to workers that have exited and are deleted when merging
+DEFAULT_PUBLISH_SECONDS = 10
+STALE_PUBLISH_INTERVALS = 3
+
+
+class QuantileSketch:
+    """Log-bucketed quantile sketch with fixed memory and exact merges"""
+
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY,
+                 num_bins=SKETCH_NUM_BINS, min_value=SKETCH_MIN_VALUE):
+        self.relative_accuracy = relative_accuracy
+        self.num_bins = num_bins
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.key_offset = math.ceil(math.log(min_value) / self.log_gamma)
+        self.positive = np.zeros(num_bins, dtype=np.int64)
+        self.negative = np.zeros(num_bins, dtype=np.int64)
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, magnitude):
+        """Map a positive magnitude to its bin, clamping to the edge bins"""
+        key = math.ceil(math.log(magnitude) / self.log_gamma)
+        return min(max(key - self.key_offset, 0), self.num_bins - 1)
+
+    def _value(self, index):
+        """Representative value for a bin"""
+        return 2 * self.gamma ** (index + self.key_offset) / (self.gamma + 1)
+
+    def update(self, value):
+        """Add a single observation in O(1)"""
+        if value > self.min_value:
+            self.positive[self._index(value)] += 1
+        elif value < -self.min_value:
+            self.negative[self._index(-value)] += 1
+        else:
+            self.zero_count += 1
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def is_compatible(self, other):
+        return (self.relative_accuracy == other.relative_accuracy
+                and self.num_bins == other.num_bins
+                and self.min_value == other.min_value)
+
+    def merge(self, other):
+        """Merge another sketch into this one (lossless)"""
+        if not self.is_compatible(other):
+            raise ValueError("Cannot merge sketches with different parameters")
+        self.positive += other.positive
+        self.negative += other.negative
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Approximate value at quantile q (0..1)"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+
+        # Walk negatives from most negative to least, then zeros, then positives
+        seen = 0
+        for index in range(self.num_bins - 1, -1, -1):
+            seen += self.negative[index]
+            if seen > rank:
+                return max(-self._value(index), self.min)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in range(self.num_bins):
+            seen += self.positive[index]
+            if seen > rank:
+                return min(self._value(index), self.max)
+        return self.max
+
+    def cdf(self, value):
+        """Approximate fraction of observations <= value"""
+        if self.count == 0:
+            return None
+        if value > self.min_value:
+            below = (self.negative.sum() + self.zero_count
+                     + self.positive[:self._index(value) + 1].sum())
+        elif value < -self.min_value:
+            below = self.negative[self._index(-value):].sum()
+        else:
+            below = self.negative.sum() + self.zero_count
+        return float(below) / self.count
+
+    def to_dict(self):
+        """Serialize to a JSON-friendly dict, storing only non-empty bins"""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "num_bins": self.num_bins,
+            "min_value": self.min_value,
+            "positive": {str(i): int(c) for i, c in enumerate(self.positive) if c},
+            "negative": {str(i): int(c) for i, c in enumerate(self.negative) if c},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"], data["num_bins"], data["min_value"])
+        for index, count in data["positive"].items():
+            sketch.positive[int(index)] = count
+        for index, count in data["negative"].items():
+            sketch.negative[int(index)] = count
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+
+class FixedHistogram:
+    """Histogram over fixed bin edges, with underflow and overflow bins"""
+
+    def __init__(self, edges):
+        self.edges = [float(e) for e in edges]
+        self.counts = [0] * (len(self.edges) + 1)
+
+    def update(self, value):
+        self.counts[bisect_right(self.edges, value)] += 1
+
+    def merge(self, other):
+        if self.edges != other.edges:
+            raise ValueError("Cannot merge histograms with different bin edges")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def proportions(self):
+        total = self.total
+        if total == 0:
+            return None
+        return [c / total for c in self.counts]
+
+    def to_dict(self):
+        return {"edges": self.edges, "counts": list(self.counts)}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["edges"])
+        histogram.counts = list(data["counts"])
+        return histogram
+
+
+def population_stability_index(expected, actual):
+    """PSI between two lists of bin proportions"""
+    psi = 0.0
+    for e, a in zip(expected, actual):
+        e = max(e, PSI_EPSILON)
+        a = max(a, PSI_EPSILON)
+        psi += (a - e) * math.log(a / e)
+    return psi
+
+
+def ks_statistic(reference_quantiles, sketch):
+    """Max CDF gap between the reference quantile points and a live sketch"""
+    gap = 0.0
+    for point in reference_quantiles:
+        gap = max(gap, abs(point["q"] - sketch.cdf(point["value"])))
+    return gap
+
+
+def drift_status(psi):
+    if psi >= PSI_SIGNIFICANT:
+        return "significant"
+    if psi >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+
+def build_reference_profile(columns, bins=REFERENCE_HISTOGRAM_BINS):
+    """Build a reference profile from training data
+
+    columns maps a feature name to a 1-D array of reference values.
+    Histogram edges are taken at reference quantiles so every bin starts
+    with a comparable share of the data.
+    """
+    profile = {"features": {}}
+    for name, values in columns.items():
+        values = np.asarray(values, dtype=float)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        histogram = FixedHistogram(edges)
+        histogram.counts = np.bincount(
+            np.searchsorted(histogram.edges, values, side="right"),
+            minlength=len(histogram.counts)
+        ).tolist()
+        profile["features"][name] = {
+            "count": int(len(values)),
+            "histogram": histogram.to_dict(),
+            "quantiles": [
+                {"q": q, "value": float(v)}
+                for q, v in zip(REFERENCE_QUANTILES, np.quantile(values, REFERENCE_QUANTILES))
+            ]
+        }
+    return profile
+
+
+def save_reference_profile(profile, path):
+    with open(path, "w") as f:
+        json.dump(profile, f)
+
+
+def load_reference_profile(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class FeatureMonitor:
+    """Live sketch and histogram for a single feature"""
+
+    def __init__(self, edges):
+        self.sketch = QuantileSketch()
+        self.histogram = FixedHistogram(edges)
+
+    def update(self, value):
+        self.sketch.update(value)
+        self.histogram.update(value)
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self.histogram.merge(other.histogram)
+
+    def to_dict(self):
+        return {"sketch": self.sketch.to_dict(), "histogram": self.histogram.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        monitor = cls(data["histogram"]["edges"])
+        monitor.sketch = QuantileSketch.from_dict(data["sketch"])
+        monitor.histogram = FixedHistogram.from_dict(data["histogram"])
+        return monitor
+
+
+class DriftMonitor:
+    """Constant-memory drift monitor for model inputs and the fraud score
+
+    Each feature keeps a quantile sketch and a histogram on the reference
+    bin edges, so memory does not grow with traffic. States from several
+    workers can be merged with merge() or merge_states().
+    """
+
+    def __init__(self, reference):
+        self.reference = reference
+        self.features = {
+            name: FeatureMonitor(spec["histogram"]["edges"])
+            for name, spec in reference["features"].items()
+        }
+        self._lock = threading.Lock()
+
+    def update(self, values):
+        """Record one observation; values maps feature name to a number
+
+        Non-finite values (inf, NaN) are skipped rather than counted.
+        """
+        with self._lock:
+            for name, value in values.items():
+                monitor = self.features.get(name)
+                value = float(value)
+                if monitor is not None and math.isfinite(value):
+                    monitor.update(value)
+
+    def merge(self, other):
+        with self._lock:
+            for name, monitor in other.features.items():
+                if name in self.features:
+                    self.features[name].merge(monitor)
+
+    def get_state(self):
+        """Serializable snapshot of the live sketches"""
+        with self._lock:
+            return {name: monitor.to_dict() for name, monitor in self.features.items()}
+
+    def load_state(self, state):
+        with self._lock:
+            for name, data in state.items():
+                if name in self.features:
+                    self.features[name] = FeatureMonitor.from_dict(data)
+
+    def report(self):
+        """PSI and KS of each live feature against the reference profile"""
+        with self._lock:
+            features = {}
+            for name, monitor in self.features.items():
+                spec = self.reference["features"][name]
+                live = monitor.histogram.proportions()
+                if live is None:
+                    features[name] = {"count": 0, "psi": None, "ks": None, "status": "no_data"}
+                    continue
+
+                expected = FixedHistogram.from_dict(spec["histogram"]).proportions()
+                psi = population_stability_index(expected, live)
+                features[name] = {
+                    "count": monitor.sketch.count,
+                    "psi": round(psi, 4),
+                    "ks": round(ks_statistic(spec["quantiles"], monitor.sketch), 4),
+                    "status": drift_status(psi),
+                    "live_median": monitor.sketch.quantile(0.5),
+                    "live_p95": monitor.sketch.quantile(0.95),
+                    "reference_count": spec["count"]
+                }
+            return {"features": features}
+
+
+def merge_states(reference, states):
+    """Combine serialized states from several workers into one monitor"""
+    merged = DriftMonitor(reference)
+    for state in states:
+        worker = DriftMonitor(reference)
+        worker.load_state(state)
+        merged.merge(worker)
+    return merged
+
+
+class DriftStatePublisher:
+    """Shares one worker's drift state with the other workers
+
+    Workers behind a single port cannot be addressed individually, so each
+    one writes worker-<pid>.json to a shared directory every `interval`
+    seconds and any worker can merge the fresh files into one report.
+    """
+
+    def __init__(self, monitor, directory, interval=DEFAULT_PUBLISH_SECONDS):
+        self.monitor = monitor
+        self.directory = directory
+        self.interval = interval
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"worker-{pid}.json")
+
+    def ensure_started(self):
+        """Start the publishing thread once per process, including after a fork"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._pid = os.getpid()
+            threading.Thread(target=self._publish_loop, name="drift-publisher", daemon=True).start()
+
+    def publish(self):
+        path = self._path(os.getpid())
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.monitor.get_state(), f)
+        os.replace(tmp_path, path)
+
+    def _publish_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"⚠️ Error publishing drift state: {e}")
+
+    def merged(self):
+        """This worker's live state merged with the other workers' published states
+
+        Returns the merged monitor and the number of workers it covers.
+        Stale files are deleted so the directory does not grow as workers
+        are recycled.
+        """
+        states = [self.monitor.get_state()]
+        own_path = self._path(os.getpid())
+        cutoff = time.time() - STALE_PUBLISH_INTERVALS * self.interval
+        for path in glob.glob(os.path.join(self.directory, "worker-*.json")):
+            if path == own_path:
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    # Left behind by an exited (e.g. recycled) worker
+                    os.remove(path)
+                    continue
+                with open(path) as f:
+                    states.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return merge_states(self.monitor.reference, states), len(states)
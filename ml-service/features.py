@@ -0,0 +1,20 @@
+import pandas as pd
+
+# Inputs the service receives; the model's other columns (the PCA components
+# V1..V28 of the training dataset) are not available at scoring time
+INPUT_FEATURES = ["Amount", "Time"]
+
+
+def build_feature_frame(model, scaler, amounts, times):
+    """Build a scaled feature frame in the model's column order
+
+    Columns other than Amount and Time are left at 0, their mean in the
+    training data (the V columns are PCA components). Used by the service,
+    the training script and the refresh script so they all score the same way.
+    """
+    columns = list(model.get_booster().feature_names or INPUT_FEATURES)
+    X = pd.DataFrame(0.0, index=range(len(amounts)), columns=columns)
+    X["Amount"] = [float(amount) for amount in amounts]
+    X["Time"] = [float(time) for time in times]
+    X[INPUT_FEATURES] = scaler.transform(X[INPUT_FEATURES])
+    return X
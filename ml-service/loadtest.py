@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import random
+import time
+from urllib.parse import urlparse
+import aiohttp
+import psutil
+from bson.objectid import ObjectId
+from tokens import generate_token
+
+# Compares the Flask (sync) and ASGI (async) servers under the same load.
+# pip install -r requirements-loadtest.txt
+#
+# Stand-ins, all local:
+#   mongod --dbpath /tmp/paywatch-db
+#   python -m aiosmtpd -n -l localhost:8025
+# Both servers with SMTP_HOST=localhost SMTP_PORT=8025 SMTP_USE_TLS=False SMTP_USER=loadtest@paywatch.local:
+#   gunicorn --workers 2 --threads 8 --bind 0.0.0.0:5001 app:app
+#   hypercorn --workers 2 --bind 0.0.0.0:5002 asgi_app:app
+# Then, on the same host as the servers (connections are counted from their sockets):
+#   python loadtest.py --target flask=http://localhost:5001 --target asgi=http://localhost:5002
+
+DEFAULT_PATH = "/transactions"
+DEFAULT_CONCURRENCY = 200
+DEFAULT_DURATION = 30
+CONNECTION_SAMPLE_SECONDS = 0.1
+LOADTEST_EMAIL = "loadtest@paywatch.local"
+
+
+def make_payload():
+    return {
+        "Amount": round(random.expovariate(1 / 90), 2),
+        "Time": random.uniform(0, 172800)
+    }
+
+
+def server_pids(port):
+    """PIDs of the processes listening on `port` (e.g. a gunicorn master and its workers)"""
+    return {
+        conn.pid for conn in psutil.net_connections(kind="tcp")
+        if conn.status == psutil.CONN_LISTEN and conn.laddr.port == port and conn.pid
+    }
+
+
+def count_connections(port, pids):
+    """Established connections on `port`: accepted by the server vs still queued in the kernel"""
+    accepted = queued = 0
+    for conn in psutil.net_connections(kind="tcp"):
+        if conn.status != psutil.CONN_ESTABLISHED or conn.laddr.port != port:
+            continue
+        if conn.pid in pids:
+            accepted += 1
+        elif conn.pid is None:
+            queued += 1
+    return accepted, queued
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.accepted_samples = []
+        self.peak_queued = 0
+
+
+async def sample_connections(port, pids, stats, deadline):
+    """Sample server-side socket counts until the run ends"""
+    while time.perf_counter() < deadline:
+        accepted, queued = await asyncio.to_thread(count_connections, port, pids)
+        stats.accepted_samples.append(accepted)
+        stats.peak_queued = max(stats.peak_queued, queued)
+        await asyncio.sleep(CONNECTION_SAMPLE_SECONDS)
+
+
+async def worker(session, url, headers, deadline, stats):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with session.post(url, json=make_payload(), headers=headers) as response:
+                await response.read()
+                if response.status >= 400:
+                    stats.errors += 1
+                else:
+                    stats.latencies.append(time.perf_counter() - start)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            stats.errors += 1
+
+
+async def run_target(base_url, path, concurrency, duration):
+    """Hold `concurrency` client connections against one server for `duration` seconds"""
+    port = urlparse(base_url).port
+    pids = server_pids(port)
+    if not pids:
+        raise SystemExit(f"❌ No local process is listening on port {port}")
+
+    headers = {"Authorization": f"Bearer {generate_token(str(ObjectId()), LOADTEST_EMAIL)}"}
+    stats = Stats()
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(
+            sample_connections(port, pids, stats, deadline),
+            *[worker(session, base_url + path, headers, deadline, stats) for _ in range(concurrency)]
+        )
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(stats.latencies)
+
+    def percentile(p):
+        if not latencies:
+            return None
+        return round(latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000, 1)
+
+    samples = stats.accepted_samples
+    return {
+        "requests": len(latencies),
+        "errors": stats.errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "conns_held_peak": max(samples, default=0),
+        "conns_held_mean": round(sum(samples) / len(samples), 1) if samples else 0,
+        "conns_queued_peak": stats.peak_queued,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99)
+    }
+
+
+async def main(targets, path, concurrency, duration):
+    results = {}
+    for name, base_url in targets:
+        print(f"⚙️ {name}: {concurrency} connections for {duration}s against {base_url}{path}")
+        results[name] = await run_target(base_url, path, concurrency, duration)
+
+    columns = ["requests", "errors", "throughput_rps", "conns_held_peak", "conns_held_mean",
+               "conns_queued_peak", "p50_ms", "p95_ms", "p99_ms"]
+    print("\n📊 Results")
+    print(f"{'server':<10}" + "".join(f"{c:>19}" for c in columns))
+    for name, result in results.items():
+        print(f"{name:<10}" + "".join(f"{str(result[c]):>19}" for c in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the PayWatch ML service")
+    parser.add_argument("--target", action="append", required=True,
+                        help="name=base_url, repeat to compare servers")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="endpoint to POST to")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--duration", type=int, default=DEFAULT_DURATION, help="seconds per target")
+    args = parser.parse_args()
+
+    targets = [tuple(target.split("=", 1)) for target in args.target]
+    asyncio.run(main(targets, args.path, args.concurrency, args.duration))
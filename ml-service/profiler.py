@@ -0,0 +1,389 @@
+import glob
+import heapq
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from functools import wraps
+
+DEFAULT_SAMPLE_RATE = 1.0
+DEFAULT_INTERVAL_MS = 5
+DEFAULT_SLOW_REQUESTS = 20
+# The sampler holds the profiler lock while it walks stacks, so it must not spin
+MIN_INTERVAL_MS = 1
+
+# Workers sync settings and publish results this often; result files older
+# than a few intervals belong to workers that have exited and are deleted
+DEFAULT_SYNC_SECONDS = 2
+STALE_SYNC_INTERVALS = 3
+
+# Bounds so a long profiling session cannot grow without limit
+MAX_STACK_DEPTH = 64
+MAX_DISTINCT_STACKS = 5000
+MAX_STACKS_PER_REQUEST = 20
+OVERFLOW_STACK = "[other]"
+
+_NULL_STAGE = nullcontext()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def format_collapsed(stacks):
+    """Collapsed-stack text, one "stack count" line per stack, hottest first"""
+    return "\n".join(f"{stack} {count}" for stack, count in Counter(stacks).most_common())
+
+
+def merge_profile_states(states, slow_requests):
+    """Combine results from several workers (see RequestProfiler.get_state)"""
+    stacks = Counter()
+    slowest = []
+    profiled_requests = 0
+    for state in states:
+        stacks.update(state["stacks"])
+        slowest.extend(state["slowest"])
+        profiled_requests += state["profiled_requests"]
+    return {
+        "stacks": stacks,
+        "slowest": heapq.nlargest(slow_requests, slowest, key=lambda entry: entry["duration_ms"]),
+        "profiled_requests": profiled_requests
+    }
+
+
+def _collapse(frame):
+    """Collapse a frame chain into a root-first, semicolon-separated stack"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame).replace(";", ":"))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class _Stage:
+    """Times one named stage of a profiled request"""
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = (time.perf_counter() - self.start) * 1000
+        stages = self.record["stages"]
+        stages[self.name] = stages.get(self.name, 0.0) + elapsed
+        return False
+
+
+class RequestProfiler:
+    """Sampling profiler for individual requests, switchable at runtime
+
+    While enabled, a background thread samples the stacks of threads that
+    are serving a profiled request and aggregates them into collapsed
+    stacks (the input format of flamegraph.pl and speedscope). The N
+    slowest requests are kept with their stage timings. While disabled,
+    start_request() and stage() only check a flag. The sampler thread is
+    started by the first profiled request of each process, so it also runs
+    in workers forked after the profiler was enabled (gunicorn --preload).
+    """
+
+    def __init__(self, enabled=False, sample_rate=DEFAULT_SAMPLE_RATE,
+                 interval_ms=DEFAULT_INTERVAL_MS, slow_requests=DEFAULT_SLOW_REQUESTS):
+        self.enabled = False
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        self.slow_requests = slow_requests
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._active = {}
+        self._stacks = Counter()
+        self._slowest = []
+        self._sequence = 0
+        self._profiled_count = 0
+        self._sampler = None
+        self._sampler_pid = None
+        if enabled:
+            self.configure(enabled=True)
+
+    def configure(self, enabled=None, sample_rate=None, interval_ms=None, slow_requests=None):
+        """Update settings; every field is validated before any is applied"""
+        if enabled is not None and not isinstance(enabled, bool):
+            raise ValueError("enabled must be a boolean")
+        for name, value in (("sample_rate", sample_rate), ("interval_ms", interval_ms),
+                            ("slow_requests", slow_requests)):
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f"{name} must be a number")
+        if sample_rate is not None and not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        if interval_ms is not None and interval_ms < MIN_INTERVAL_MS:
+            raise ValueError(f"interval_ms must be at least {MIN_INTERVAL_MS}")
+        if slow_requests is not None and slow_requests < 1:
+            raise ValueError("slow_requests must be at least 1")
+
+        if sample_rate is not None:
+            self.sample_rate = float(sample_rate)
+        if interval_ms is not None:
+            self.interval_ms = float(interval_ms)
+        if slow_requests is not None:
+            with self._lock:
+                self.slow_requests = int(slow_requests)
+                while len(self._slowest) > self.slow_requests:
+                    heapq.heappop(self._slowest)
+        if enabled is not None:
+            self.enabled = enabled
+
+    def settings(self):
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval_ms,
+            "slow_requests": self.slow_requests
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._slowest = []
+            self._profiled_count = 0
+
+    def start_request(self, name):
+        """Begin profiling the current request; returns None when not sampled"""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        self._ensure_sampler()
+
+        record = {
+            "name": name,
+            "started_at": time.time(),
+            "start": time.perf_counter(),
+            "stages": {},
+            "stacks": Counter()
+        }
+        self._local.record = record
+        with self._lock:
+            self._active[threading.get_ident()] = record
+        return record
+
+    def finish_request(self, record, status_code=None):
+        if record is None:
+            return
+
+        duration_ms = (time.perf_counter() - record["start"]) * 1000
+        self._local.record = None
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            self._profiled_count += 1
+            self._sequence += 1
+            entry = (duration_ms, self._sequence, {
+                "name": record["name"],
+                "status_code": status_code,
+                "started_at": record["started_at"],
+                "duration_ms": round(duration_ms, 3),
+                "stages_ms": {k: round(v, 3) for k, v in record["stages"].items()},
+                "samples": sum(record["stacks"].values()),
+                "top_stacks": record["stacks"].most_common(MAX_STACKS_PER_REQUEST)
+            })
+            if len(self._slowest) < self.slow_requests:
+                heapq.heappush(self._slowest, entry)
+            elif duration_ms > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def stage(self, name):
+        """Context manager timing a stage of the current profiled request"""
+        record = getattr(self._local, "record", None)
+        if record is None:
+            return _NULL_STAGE
+        return _Stage(record, name)
+
+    def staged(self, name):
+        """Decorator form of stage(), e.g. for DB-backed helpers"""
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                with self.stage(name):
+                    return f(*args, **kwargs)
+            return decorated
+        return decorator
+
+    def _ensure_sampler(self):
+        """Start the sampler thread if this process has none running"""
+        if self._sampler_pid == os.getpid() and self._sampler.is_alive():
+            return
+        with self._lock:
+            if self._sampler_pid == os.getpid() and self._sampler.is_alive():
+                return
+            self._sampler = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+            self._sampler_pid = os.getpid()
+            self._sampler.start()
+
+    def _sample_loop(self):
+        while self.enabled:
+            time.sleep(self.interval_ms / 1000)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, record in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    stack = _collapse(frame)
+                    record["stacks"][stack] += 1
+                    if stack in self._stacks or len(self._stacks) < MAX_DISTINCT_STACKS:
+                        self._stacks[stack] += 1
+                    else:
+                        self._stacks[OVERFLOW_STACK] += 1
+
+    def flamegraph(self):
+        """Aggregated samples in collapsed-stack format, one stack per line"""
+        with self._lock:
+            return format_collapsed(self._stacks)
+
+    def get_state(self):
+        """Serializable snapshot of this process's results"""
+        with self._lock:
+            return {
+                "stacks": dict(self._stacks),
+                "slowest": [entry for _, _, entry in sorted(self._slowest, reverse=True)],
+                "profiled_requests": self._profiled_count
+            }
+
+    def slowest(self):
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._slowest, reverse=True)]
+
+    def status(self):
+        with self._lock:
+            return {
+                **self.settings(),
+                "profiled_requests": self._profiled_count,
+                "distinct_stacks": len(self._stacks),
+                "total_samples": sum(self._stacks.values())
+            }
+
+
+class ProfilerStateSync:
+    """Shares profiler settings and results between workers
+
+    Workers behind a single port cannot be addressed individually, so
+    settings changed through one worker are written to settings.json and
+    picked up by the others every `interval` seconds, and each worker
+    writes its results to worker-<pid>.json for any worker to merge.
+    """
+
+    def __init__(self, profiler, directory, interval=DEFAULT_SYNC_SECONDS):
+        self.profiler = profiler
+        self.directory = directory
+        self.interval = interval
+        self._pid = None
+        self._lock = threading.Lock()
+        self._settings_mtime = None
+        self._reset_at = None
+
+    @property
+    def settings_path(self):
+        return os.path.join(self.directory, "settings.json")
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"worker-{pid}.json")
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def ensure_started(self):
+        """Start the sync thread once per process, including after a fork"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._pid = os.getpid()
+            self.load_settings()
+            threading.Thread(target=self._sync_loop, name="profiler-sync", daemon=True).start()
+
+    def save_settings(self, reset=False):
+        """Publish this worker's current settings to the other workers"""
+        os.makedirs(self.directory, exist_ok=True)
+        if reset:
+            self._reset_at = time.time()
+        self._write(self.settings_path, {**self.profiler.settings(), "reset_at": self._reset_at})
+        self._settings_mtime = os.path.getmtime(self.settings_path)
+
+    def load_settings(self):
+        """Apply settings saved by any worker, if they changed since the last load"""
+        try:
+            mtime = os.path.getmtime(self.settings_path)
+        except OSError:
+            return
+        if mtime == self._settings_mtime:
+            return
+        self._settings_mtime = mtime
+
+        try:
+            with open(self.settings_path) as f:
+                data = json.load(f)
+            self.profiler.configure(
+                enabled=data["enabled"],
+                sample_rate=data["sample_rate"],
+                interval_ms=data["interval_ms"],
+                slow_requests=data["slow_requests"]
+            )
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring profiler settings in {self.settings_path}: {e}")
+            return
+
+        if data.get("reset_at") != self._reset_at:
+            self._reset_at = data.get("reset_at")
+            self.profiler.reset()
+
+    def publish(self):
+        self._write(self._path(os.getpid()), self.profiler.get_state())
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.load_settings()
+                self.publish()
+            except Exception as e:
+                print(f"⚠️ Error syncing profiler state: {e}")
+
+    def merged(self):
+        """This worker's results merged with the other workers' published results
+
+        Returns the merged state and the number of workers it covers.
+        Results published before the last reset are left out, stale files
+        are deleted.
+        """
+        self.load_settings()
+        states = [self.profiler.get_state()]
+        own_path = self._path(os.getpid())
+        cutoff = time.time() - STALE_SYNC_INTERVALS * self.interval
+        for path in glob.glob(os.path.join(self.directory, "worker-*.json")):
+            if path == own_path:
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+                if mtime < cutoff:
+                    # Left behind by an exited (e.g. recycled) worker
+                    os.remove(path)
+                    continue
+                if self._reset_at is not None and mtime < self._reset_at:
+                    continue
+                with open(path) as f:
+                    states.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return merge_profile_states(states, self.profiler.slow_requests), len(states)
@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+import joblib
+import pandas as pd
+from sklearn.metrics import average_precision_score, roc_auc_score
+from xgboost import XGBClassifier
+from features import INPUT_FEATURES, build_feature_frame
+from drift_monitor import SCORE_FEATURE, build_reference_profile, load_reference_profile, save_reference_profile
+from database import (
+    ensure_label_indexes, stream_verified_transactions, stream_reviewed_alerts,
+    get_reviewed_alerts, get_transactions_by_ids
+)
+
+MODEL_PATH = os.path.join("models", "paywatch_model.pkl")
+PREVIOUS_MODEL_PATH = os.path.join("models", "paywatch_model.prev.pkl")
+SCALER_PATH = os.path.join("models", "scaler.pkl")
+HOLDOUT_PATH = os.path.join("models", "holdout.pkl")
+STATE_PATH = os.path.join("models", "refresh_state.json")
+REFERENCE_PATH = os.path.join("models", "reference_profile.json")
+PREVIOUS_REFERENCE_PATH = os.path.join("models", "reference_profile.prev.json")
+
+# Outcome statuses that carry a label; anything else is ignored.
+# Transactions: an OTP-verified or approved transaction was made by the
+# account holder, a rejected one was not.
+TRANSACTION_LABELS = {"verified": 0, "approved": 0, "rejected": 1}
+# Alerts (pending/reviewed/resolved/false_positive): an analyst closes an
+# alert either as false_positive, or as resolved once the fraud has been
+# confirmed and handled, so resolved is the fraud outcome. pending and
+# reviewed are not final and carry no label.
+ALERT_LABELS = {"false_positive": 0, "resolved": 1}
+
+# Labels written in the last minute may still be in flight, leave them for the next run
+LABEL_SETTLE_SECONDS = 60
+
+DEFAULT_ROUNDS = 20
+DEFAULT_MIN_LABELS = 50
+# Largest drop in holdout average precision accepted before publishing, measured
+# from the best model so far (the full train or any published refresh), so a
+# series of refreshes cannot lose a little precision each time
+MAX_HOLDOUT_AP_DROP = 0.01
+
+
+def load_state():
+    """Load the refresh watermark, model version and best holdout AP"""
+    if not os.path.exists(STATE_PATH):
+        return {"watermark": None, "version": 0, "best_holdout_ap": None}
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+
+def save_state(state):
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def collect_labels(since, until):
+    """Collect labels that changed in (since, until]
+
+    Only documents past the watermark are read, so the cost follows the
+    number of new labels rather than the size of the history. Analyst
+    review of an alert overrides the OTP outcome of its transaction, also
+    when the review happened in an earlier run.
+    """
+    labels = {}
+
+    for transaction in stream_verified_transactions(since, until):
+        label = TRANSACTION_LABELS.get(transaction.get("status"))
+        if label is not None:
+            labels[str(transaction["_id"])] = (transaction["amount"], transaction["time"], label)
+
+    # Reviewed alerts for these transactions, whenever they were reviewed; latest review wins
+    if labels:
+        for alert in get_reviewed_alerts(labels.keys(), ALERT_LABELS.keys()):
+            tid = str(alert["transaction_id"])
+            amount, time, _ = labels[tid]
+            labels[tid] = (amount, time, ALERT_LABELS[alert["status"]])
+
+    # Alerts reviewed in this window for transactions not re-verified in it
+    alert_labels = {}
+    for alert in stream_reviewed_alerts(since, until):
+        label = ALERT_LABELS.get(alert.get("status"))
+        if label is not None:
+            alert_labels[str(alert["transaction_id"])] = label
+
+    missing = [tid for tid in alert_labels if tid not in labels]
+    known = {str(t["_id"]): t for t in get_transactions_by_ids(missing)} if missing else {}
+    for tid in missing:
+        if tid in known:
+            labels[tid] = (known[tid]["amount"], known[tid]["time"], alert_labels[tid])
+
+    return list(labels.values())
+
+
+def build_features(model, scaler, rows):
+    """Build the training frame the same way the service scores transactions"""
+    X = build_feature_frame(
+        model, scaler,
+        [amount for amount, _, _ in rows],
+        [time for _, time, _ in rows]
+    )
+    y = pd.Series([label for _, _, label in rows])
+    return X, y
+
+
+def passes_holdout_gate(refreshed_ap, best_ap):
+    """Whether a refreshed model's holdout AP is close enough to the best so far"""
+    return refreshed_ap >= best_ap - MAX_HOLDOUT_AP_DROP
+
+
+def update_score_reference(model, scaler, X_holdout):
+    """Recompute the fraud_score entry of the drift reference profile
+
+    Called when a refreshed model is published, so /drift compares live
+    scores with the new model's scores on the holdout instead of reporting
+    the refresh itself as score drift. The holdout is scored from Amount and
+    Time only, the way the service scores transactions.
+    """
+    if not os.path.exists(REFERENCE_PATH):
+        print("⚠️ No drift reference profile found, skipping fraud_score reference")
+        return
+
+    raw = scaler.inverse_transform(X_holdout[INPUT_FEATURES])
+    scores = model.predict_proba(build_feature_frame(model, scaler, raw[:, 0], raw[:, 1]))[:, 1]
+
+    profile = load_reference_profile(REFERENCE_PATH)
+    profile["features"][SCORE_FEATURE] = build_reference_profile({SCORE_FEATURE: scores})["features"][SCORE_FEATURE]
+
+    tmp_path = REFERENCE_PATH + ".tmp"
+    save_reference_profile(profile, tmp_path)
+    shutil.copy2(REFERENCE_PATH, PREVIOUS_REFERENCE_PATH)
+    os.replace(tmp_path, REFERENCE_PATH)
+    print(f"💾 fraud_score reference updated in: {REFERENCE_PATH}")
+
+
+def evaluate(model, X_holdout, y_holdout):
+    scores = model.predict_proba(X_holdout)[:, 1]
+    return {
+        "average_precision": round(float(average_precision_score(y_holdout, scores)), 4),
+        "roc_auc": round(float(roc_auc_score(y_holdout, scores)), 4)
+    }
+
+
+def refresh(rounds=DEFAULT_ROUNDS, min_labels=DEFAULT_MIN_LABELS, dry_run=False):
+    """Continue boosting the current model on new labels and publish it if the holdout allows"""
+    ensure_label_indexes()
+    state = load_state()
+    since = datetime.fromisoformat(state["watermark"]) if state["watermark"] else None
+    until = datetime.utcnow() - timedelta(seconds=LABEL_SETTLE_SECONDS)
+    print(f"📂 Collecting labels verified since: {since or 'the beginning'}")
+
+    rows = collect_labels(since, until)
+    print(f"✅ New labels: {len(rows)}")
+
+    if len(rows) < min_labels:
+        print(f"⚠️ Fewer than {min_labels} new labels, skipping refresh")
+        return False
+
+    if len({label for _, _, label in rows}) < 2:
+        print("⚠️ New labels contain a single class, skipping refresh")
+        return False
+
+    model = joblib.load(MODEL_PATH)
+    scaler = joblib.load(SCALER_PATH)
+    X_holdout, y_holdout = joblib.load(HOLDOUT_PATH)
+    X, y = build_features(model, scaler, rows)
+
+    # Continue boosting from the current trees instead of starting over
+    print(f"⚙️ Adding {rounds} boosting rounds to the current model...")
+    refreshed = XGBClassifier(**model.get_params())
+    refreshed.set_params(n_estimators=rounds)
+    refreshed.fit(X, y, xgb_model=model.get_booster())
+
+    current_metrics = evaluate(model, X_holdout, y_holdout)
+    refreshed_metrics = evaluate(refreshed, X_holdout, y_holdout)
+    # State files written before best_holdout_ap existed start from the current model
+    best_ap = max(state.get("best_holdout_ap") or 0.0, current_metrics["average_precision"])
+    print(f"📊 Holdout current:   {current_metrics}")
+    print(f"📊 Holdout refreshed: {refreshed_metrics}")
+    print(f"📊 Best holdout AP so far: {best_ap}")
+
+    if not passes_holdout_gate(refreshed_metrics["average_precision"], best_ap):
+        print("❌ Refreshed model is worse on the holdout, keeping the current model")
+        return False
+
+    if dry_run:
+        print("⚠️ Dry run, not publishing")
+        return False
+
+    # Keep a copy of the current model for rollback, then swap the new one in
+    # with a single rename so MODEL_PATH always holds a complete model
+    tmp_path = MODEL_PATH + ".tmp"
+    joblib.dump(refreshed, tmp_path)
+    shutil.copy2(MODEL_PATH, PREVIOUS_MODEL_PATH)
+    os.replace(tmp_path, MODEL_PATH)
+    update_score_reference(refreshed, scaler, X_holdout)
+
+    state = {
+        "watermark": until.isoformat(),
+        "version": state["version"] + 1,
+        "published_at": datetime.utcnow().isoformat(),
+        "labels_used": len(rows),
+        "holdout": refreshed_metrics,
+        "best_holdout_ap": max(best_ap, refreshed_metrics["average_precision"])
+    }
+    save_state(state)
+    print(f"💾 Model version {state['version']} saved to: {MODEL_PATH}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally refresh the PayWatch model from verified outcomes")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="boosting rounds to add")
+    parser.add_argument("--min-labels", type=int, default=DEFAULT_MIN_LABELS, help="minimum new labels to refresh")
+    parser.add_argument("--dry-run", action="store_true", help="evaluate without publishing")
+    args = parser.parse_args()
+
+    refresh(rounds=args.rounds, min_labels=args.min_labels, dry_run=args.dry_run)
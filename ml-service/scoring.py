@@ -0,0 +1,114 @@
+import os
+from contextlib import nullcontext
+import joblib
+from config import Config
+from features import build_feature_frame
+from drift_monitor import DriftMonitor, DriftStatePublisher, load_reference_profile
+
+# Model, scaler and drift monitoring shared by the Flask (app.py) and ASGI
+# (asgi_app.py) servers. Kept free of web framework and database imports so
+# each server only loads what it serves with.
+
+# Load trained model
+model_path = os.path.join("models", "paywatch_model.pkl")
+try:
+    model = joblib.load(model_path)
+    print("✅ Model loaded successfully")
+except Exception as e:
+    print(f"❌ Error loading model: {e}")
+    model = None
+
+# Load saved scaler
+scaler_path = os.path.join("models", "scaler.pkl")
+try:
+    scaler = joblib.load(scaler_path)
+    print("✅ Scaler loaded successfully")
+except Exception as e:
+    print(f"❌ Error loading scaler: {e}")
+    scaler = None
+
+# Load reference profile for drift monitoring
+reference_path = os.path.join("models", "reference_profile.json")
+try:
+    reference_profile = load_reference_profile(reference_path)
+    drift_monitor = DriftMonitor(reference_profile)
+    print("✅ Drift reference profile loaded successfully")
+except Exception as e:
+    print(f"⚠️ Drift monitoring disabled, reference profile not loaded: {e}")
+    reference_profile = None
+    drift_monitor = None
+
+# Set by share_drift_state() in the server module
+drift_publisher = None
+
+
+def share_drift_state(server_name):
+    """Share drift state between the workers of one server
+
+    Each server gets its own DRIFT_STATE_DIR/<server_name> directory, so the
+    Flask and ASGI servers on one host do not merge each other's traffic.
+    """
+    global drift_publisher
+    if drift_monitor is not None and Config.DRIFT_STATE_DIR:
+        drift_publisher = DriftStatePublisher(
+            drift_monitor,
+            os.path.join(Config.DRIFT_STATE_DIR, server_name),
+            Config.DRIFT_PUBLISH_SECONDS
+        )
+
+
+def record_drift(amount, time, fraud_score):
+    """Feed the drift monitor; a monitoring failure never fails the prediction"""
+    try:
+        if drift_publisher is not None:
+            drift_publisher.ensure_started()
+        drift_monitor.update({"Amount": amount, "Time": time, "fraud_score": fraud_score})
+    except Exception as e:
+        print(f"⚠️ Error updating drift monitor: {e}")
+
+
+def drift_report():
+    """Drift report covering every worker that published its state"""
+    if drift_publisher is None:
+        return {**drift_monitor.report(), "workers": 1}
+
+    merged, workers = drift_publisher.merged()
+    return {**merged.report(), "workers": workers}
+
+
+def score_transaction(amount, time, profiler=None):
+    """Score one transaction and record it for drift monitoring
+
+    CPU-bound; the ASGI server calls this from an executor. Stages are
+    timed when a RequestProfiler is passed (Flask server only).
+    """
+    stage = profiler.stage if profiler is not None else (lambda name: nullcontext())
+
+    with stage("preprocess"):
+        # Scaled Amount and Time in the model's column order
+        df = build_feature_frame(model, scaler, [amount], [time])
+
+    with stage("inference"):
+        # Predict fraud
+        prediction = int(model.predict(df)[0])
+
+        # Get fraud probability score
+        try:
+            fraud_proba = model.predict_proba(df)[0]
+            fraud_score = float(fraud_proba[1])  # Probability of fraud (class 1)
+            confidence = float(max(fraud_proba))
+        except:
+            # If model doesn't support predict_proba, use a simple heuristic
+            fraud_score = 0.85 if prediction == 1 else 0.15
+            confidence = 0.85
+
+    if drift_monitor is not None:
+        with stage("drift"):
+            record_drift(amount, time, fraud_score)
+
+    return {
+        "prediction": prediction,
+        "fraud_score": round(fraud_score, 4),
+        "status": "fraud" if prediction == 1 else "legitimate",
+        "confidence": round(confidence, 4)
+    }
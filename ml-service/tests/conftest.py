@@ -0,0 +1,21 @@
+import os
+import mongomock
+import pytest
+
+# Keep workers' shared drift and profiling state out of the temp dir during tests
+os.environ["DRIFT_STATE_DIR"] = ""
+os.environ["PROFILING_STATE_DIR"] = ""
+
+import database
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Point the database module's collections at an in-memory mongomock database"""
+    db = mongomock.MongoClient().paywatch
+    for name, collection in (("users_collection", db.users),
+                             ("transactions_collection", db.transactions),
+                             ("fraud_alerts_collection", db.fraud_alerts),
+                             ("otp_collection", db.otps)):
+        monkeypatch.setattr(database, name, collection)
+    return db
@@ -0,0 +1,198 @@
+import json
+import math
+import os
+import time
+import numpy as np
+import pytest
+from drift_monitor import (
+    SKETCH_RELATIVE_ACCURACY, STALE_PUBLISH_INTERVALS, DriftMonitor, DriftStatePublisher,
+    QuantileSketch, build_reference_profile, drift_status, ks_statistic, merge_states,
+    population_stability_index
+)
+
+
+def sketch_of(values):
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.update(float(value))
+    return sketch
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(42)
+
+
+@pytest.fixture
+def reference(rng):
+    return build_reference_profile({
+        "Amount": rng.lognormal(3, 1, 5000),
+        "Time": rng.uniform(0, 172800, 5000),
+        "fraud_score": rng.beta(1, 20, 5000)
+    })
+
+
+def test_sketch_quantiles_within_relative_accuracy(rng):
+    values = rng.lognormal(3, 1.5, 20000)
+    sketch = sketch_of(values)
+
+    for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+        exact = np.quantile(values, q, method="lower")
+        assert sketch.quantile(q) == pytest.approx(exact, rel=2 * SKETCH_RELATIVE_ACCURACY)
+
+
+def test_sketch_handles_negative_and_zero_values():
+    sketch = sketch_of([-100, -10, 0, 0, 10, 100])
+
+    assert sketch.quantile(0) == -100
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1) == 100
+    assert sketch.cdf(0) == pytest.approx(4 / 6)
+    assert sketch.cdf(-50) == pytest.approx(1 / 6)
+
+
+def test_sketch_cdf_matches_data(rng):
+    values = rng.lognormal(3, 1, 10000)
+    sketch = sketch_of(values)
+
+    for point in np.quantile(values, [0.1, 0.5, 0.9]):
+        assert sketch.cdf(point) == pytest.approx(np.mean(values <= point), abs=0.02)
+
+
+def test_empty_sketch_has_no_quantile_or_cdf():
+    sketch = QuantileSketch()
+
+    assert sketch.quantile(0.5) is None
+    assert sketch.cdf(1.0) is None
+
+
+def test_sketch_merge_equals_sketch_of_all_values(rng):
+    a_values = rng.lognormal(3, 1, 3000)
+    b_values = -rng.lognormal(1, 1, 2000)
+    merged = sketch_of(a_values)
+    merged.merge(sketch_of(b_values))
+    combined = sketch_of(np.concatenate([a_values, b_values]))
+
+    assert merged.to_dict() == combined.to_dict()
+
+
+def test_sketch_serialization_round_trip(rng):
+    sketch = sketch_of(rng.normal(0, 50, 1000))
+    restored = QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+
+    assert restored.to_dict() == sketch.to_dict()
+    assert restored.quantile(0.5) == sketch.quantile(0.5)
+
+
+def test_sketch_merge_rejects_different_parameters():
+    with pytest.raises(ValueError):
+        QuantileSketch().merge(QuantileSketch(relative_accuracy=0.05))
+
+
+def test_psi_identical_distributions_is_zero():
+    proportions = [0.1] * 10
+
+    assert population_stability_index(proportions, proportions) == 0.0
+    assert drift_status(0.0) == "stable"
+
+
+def test_psi_thresholds():
+    assert drift_status(0.1) == "moderate"
+    assert drift_status(0.25) == "significant"
+    assert population_stability_index([0.5, 0.5], [0.9, 0.1]) > 0.25
+
+
+def test_psi_tolerates_empty_bins():
+    psi = population_stability_index([0.5, 0.5, 0.0], [0.0, 0.5, 0.5])
+
+    assert math.isfinite(psi)
+    assert psi > 0.25
+
+
+def test_ks_statistic_same_and_shifted_distribution(rng, reference):
+    quantiles = reference["features"]["Amount"]["quantiles"]
+
+    same = sketch_of(rng.lognormal(3, 1, 5000))
+    shifted = sketch_of(rng.lognormal(4, 1, 5000))
+
+    assert ks_statistic(quantiles, same) < 0.05
+    assert ks_statistic(quantiles, shifted) > 0.3
+
+
+def test_report_flags_shifted_feature_only(rng, reference):
+    monitor = DriftMonitor(reference)
+    for amount, t, score in zip(rng.lognormal(5, 1, 3000), rng.uniform(0, 172800, 3000),
+                                rng.beta(1, 20, 3000)):
+        monitor.update({"Amount": amount, "Time": t, "fraud_score": score})
+
+    features = monitor.report()["features"]
+    assert features["Amount"]["status"] == "significant"
+    assert features["Time"]["status"] == "stable"
+    assert features["fraud_score"]["status"] == "stable"
+    assert features["Amount"]["count"] == 3000
+
+
+def test_report_without_traffic(reference):
+    features = DriftMonitor(reference).report()["features"]
+
+    assert features["Amount"] == {"count": 0, "psi": None, "ks": None, "status": "no_data"}
+
+
+def test_update_skips_non_finite_values(reference):
+    monitor = DriftMonitor(reference)
+    monitor.update({"Amount": math.inf, "Time": math.nan, "fraud_score": 0.1})
+    monitor.update({"Amount": 10.0, "Unknown": 1.0})
+
+    features = monitor.report()["features"]
+    assert features["Amount"]["count"] == 1
+    assert features["Time"]["status"] == "no_data"
+    assert features["fraud_score"]["count"] == 1
+
+
+def test_merge_states_combines_workers(rng, reference):
+    workers = []
+    for _ in range(3):
+        worker = DriftMonitor(reference)
+        for amount in rng.lognormal(3, 1, 100):
+            worker.update({"Amount": amount})
+        workers.append(json.loads(json.dumps(worker.get_state())))
+
+    merged = merge_states(reference, workers)
+
+    assert merged.report()["features"]["Amount"]["count"] == 300
+
+
+def test_publisher_merges_fresh_and_deletes_stale_files(tmp_path, reference):
+    monitor = DriftMonitor(reference)
+    monitor.update({"Amount": 10.0})
+    publisher = DriftStatePublisher(monitor, str(tmp_path), interval=10)
+
+    other = DriftMonitor(reference)
+    other.update({"Amount": 20.0})
+    other.update({"Amount": 30.0})
+    fresh = tmp_path / "worker-1.json"
+    fresh.write_text(json.dumps(other.get_state()))
+    stale = tmp_path / "worker-2.json"
+    stale.write_text(json.dumps(other.get_state()))
+    old = time.time() - (STALE_PUBLISH_INTERVALS + 1) * 10
+    os.utime(stale, (old, old))
+
+    merged, workers = publisher.merged()
+
+    assert workers == 2
+    assert merged.report()["features"]["Amount"]["count"] == 3
+    assert fresh.exists()
+    assert not stale.exists()
+
+
+def test_publisher_writes_own_state(tmp_path, reference):
+    monitor = DriftMonitor(reference)
+    monitor.update({"Amount": 10.0})
+    publisher = DriftStatePublisher(monitor, str(tmp_path))
+
+    publisher.publish()
+
+    path = tmp_path / f"worker-{os.getpid()}.json"
+    assert json.loads(path.read_text()) == json.loads(json.dumps(monitor.get_state()))
+    # Its own file is not counted twice
+    assert publisher.merged()[1] == 1
@@ -0,0 +1,91 @@
+import pytest
+import otp_service
+from config import Config
+
+
+class FakeSMTP:
+    """Records the calls otp_service makes on an SMTP connection"""
+
+    instances = []
+
+    def __init__(self, host, port):
+        self.address = (host, port)
+        self.calls = []
+        self.sent = []
+        FakeSMTP.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def starttls(self):
+        self.calls.append("starttls")
+
+    def login(self, user, password):
+        self.calls.append("login")
+
+    def send_message(self, msg):
+        self.sent.append(msg)
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    FakeSMTP.instances = []
+    monkeypatch.setattr(otp_service.smtplib, "SMTP", FakeSMTP)
+    return FakeSMTP
+
+
+def configure_smtp(monkeypatch, user, password, use_tls):
+    monkeypatch.setattr(Config, "SMTP_USER", user)
+    monkeypatch.setattr(Config, "SMTP_PASSWORD", password)
+    monkeypatch.setattr(Config, "SMTP_USE_TLS", use_tls)
+
+
+def test_user_without_password_prints_otp_to_console(monkeypatch, smtp, capsys):
+    configure_smtp(monkeypatch, "dev@paywatch.local", "", True)
+
+    assert otp_service.send_otp_email("user@example.com", "123456", 250.0)
+
+    assert smtp.instances == []
+    assert "123456" in capsys.readouterr().out
+
+
+def test_no_smtp_user_prints_otp_to_console(monkeypatch, smtp):
+    configure_smtp(monkeypatch, "", "secret", False)
+
+    assert otp_service.send_otp_email("user@example.com", "123456")
+
+    assert smtp.instances == []
+
+
+def test_authenticated_delivery_uses_starttls_and_login(monkeypatch, smtp):
+    configure_smtp(monkeypatch, "alerts@paywatch.local", "secret", True)
+
+    assert otp_service.send_otp_email("user@example.com", "123456", 250.0)
+
+    [connection] = smtp.instances
+    assert connection.calls == ["starttls", "login"]
+    assert connection.sent[0]["To"] == "user@example.com"
+
+
+def test_unauthenticated_delivery_only_when_tls_is_off(monkeypatch, smtp):
+    configure_smtp(monkeypatch, "loadtest@paywatch.local", "", False)
+
+    assert otp_service.send_otp_email("user@example.com", "123456")
+
+    [connection] = smtp.instances
+    assert connection.calls == []
+    assert len(connection.sent) == 1
+
+
+def test_send_failure_returns_false(monkeypatch, smtp):
+    configure_smtp(monkeypatch, "alerts@paywatch.local", "secret", True)
+
+    def refuse(self, user, password):
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(FakeSMTP, "login", refuse)
+
+    assert otp_service.send_otp_email("user@example.com", "123456") is False
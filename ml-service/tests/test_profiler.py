@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+import pytest
+from profiler import (
+    DEFAULT_SAMPLE_RATE, STALE_SYNC_INTERVALS, ProfilerStateSync, RequestProfiler,
+    format_collapsed, merge_profile_states
+)
+
+
+def profile_request(profiler, name="POST /predict", seconds=0.0, status_code=200):
+    record = profiler.start_request(name)
+    with profiler.stage("inference"):
+        time.sleep(seconds)
+    profiler.finish_request(record, status_code)
+    return record
+
+
+@pytest.mark.parametrize("settings", [
+    {"enabled": "false"},
+    {"enabled": 1},
+    {"sample_rate": "0.5"},
+    {"sample_rate": True},
+    {"sample_rate": 1.5},
+    {"sample_rate": -0.1},
+    {"interval_ms": 0},
+    {"interval_ms": 0.01},
+    {"interval_ms": False},
+    {"slow_requests": 0},
+    {"slow_requests": "5"},
+])
+def test_configure_rejects_invalid_settings(settings):
+    profiler = RequestProfiler()
+    before = profiler.settings()
+
+    with pytest.raises(ValueError):
+        profiler.configure(**settings)
+
+    assert profiler.settings() == before
+
+
+def test_configure_applies_nothing_when_any_field_is_invalid():
+    profiler = RequestProfiler()
+
+    with pytest.raises(ValueError):
+        profiler.configure(enabled=True, sample_rate=0.5, interval_ms=0)
+
+    assert profiler.enabled is False
+    assert profiler.sample_rate == DEFAULT_SAMPLE_RATE
+
+
+def test_configure_applies_valid_settings():
+    profiler = RequestProfiler()
+
+    profiler.configure(enabled=True, sample_rate=0.25, interval_ms=1, slow_requests=3)
+
+    assert profiler.settings() == {"enabled": True, "sample_rate": 0.25, "interval_ms": 1.0, "slow_requests": 3}
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = RequestProfiler()
+
+    assert profiler.start_request("POST /predict") is None
+    assert profiler.get_state() == {"stacks": {}, "slowest": [], "profiled_requests": 0}
+
+
+def test_sampler_starts_with_the_first_profiled_request():
+    profiler = RequestProfiler(enabled=True)
+    assert profiler._sampler is None
+
+    profile_request(profiler)
+
+    assert profiler._sampler_pid == os.getpid()
+    assert profiler._sampler.is_alive()
+    profiler.configure(enabled=False)
+
+
+def test_profiled_request_collects_stacks_and_stages():
+    profiler = RequestProfiler(enabled=True, interval_ms=1)
+
+    profile_request(profiler, seconds=0.1)
+    profiler.configure(enabled=False)
+
+    state = profiler.get_state()
+    slowest = state["slowest"][0]
+    assert state["profiled_requests"] == 1
+    assert slowest["name"] == "POST /predict"
+    assert slowest["status_code"] == 200
+    assert slowest["stages_ms"]["inference"] >= 100
+    assert slowest["samples"] > 0
+    assert "profile_request" in profiler.flamegraph()
+
+
+def test_only_the_slowest_requests_are_kept():
+    profiler = RequestProfiler(enabled=True, slow_requests=2)
+
+    for seconds in (0.0, 0.03, 0.01, 0.02):
+        profile_request(profiler, seconds=seconds)
+    profiler.configure(enabled=False)
+
+    durations = [entry["stages_ms"]["inference"] for entry in profiler.slowest()]
+    assert len(durations) == 2
+    assert durations[0] >= 30 and durations[1] >= 20
+
+
+def test_merge_profile_states():
+    first = {"stacks": {"a;b": 2}, "slowest": [{"duration_ms": 5.0}], "profiled_requests": 1}
+    second = {"stacks": {"a;b": 1, "a;c": 4}, "slowest": [{"duration_ms": 9.0}, {"duration_ms": 1.0}],
+              "profiled_requests": 2}
+
+    merged = merge_profile_states([first, second], slow_requests=2)
+
+    assert merged["stacks"] == {"a;b": 3, "a;c": 4}
+    assert [entry["duration_ms"] for entry in merged["slowest"]] == [9.0, 5.0]
+    assert merged["profiled_requests"] == 3
+    assert format_collapsed(merged["stacks"]) == "a;c 4\na;b 3"
+
+
+def test_settings_reach_other_workers(tmp_path):
+    posted = RequestProfiler()
+    other = RequestProfiler()
+    posted_sync = ProfilerStateSync(posted, str(tmp_path))
+    other_sync = ProfilerStateSync(other, str(tmp_path))
+
+    posted.configure(enabled=True, sample_rate=0.5, interval_ms=2)
+    posted_sync.save_settings()
+    other_sync.load_settings()
+
+    assert other.settings() == posted.settings()
+    posted.configure(enabled=False)
+    other.configure(enabled=False)
+
+
+def test_reset_reaches_other_workers(tmp_path):
+    posted = RequestProfiler(enabled=True)
+    other = RequestProfiler(enabled=True)
+    posted_sync = ProfilerStateSync(posted, str(tmp_path))
+    other_sync = ProfilerStateSync(other, str(tmp_path))
+    posted_sync.save_settings()
+    other_sync.load_settings()
+    profile_request(other)
+
+    posted_sync.save_settings(reset=True)
+    other_sync.load_settings()
+
+    assert other.get_state()["profiled_requests"] == 0
+    posted.configure(enabled=False)
+    other.configure(enabled=False)
+
+
+def test_invalid_settings_file_is_ignored(tmp_path):
+    profiler = RequestProfiler()
+    sync = ProfilerStateSync(profiler, str(tmp_path))
+    (tmp_path / "settings.json").write_text('{"enabled": "yes"}')
+
+    sync.load_settings()
+
+    assert profiler.enabled is False
+
+
+def test_merged_results_cover_fresh_workers_and_delete_stale_files(tmp_path):
+    local = RequestProfiler(enabled=True)
+    sync = ProfilerStateSync(local, str(tmp_path), interval=2)
+    profile_request(local)
+
+    other = RequestProfiler(enabled=True)
+    profile_request(other)
+    profile_request(other)
+    other_sync = ProfilerStateSync(other, str(tmp_path))
+    # Publish as two other workers, one of which exited long ago
+    other_sync._write(other_sync._path(1), other.get_state())
+    stale = tmp_path / "worker-2.json"
+    other_sync._write(str(stale), other.get_state())
+    old = time.time() - (STALE_SYNC_INTERVALS + 1) * 2
+    os.utime(stale, (old, old))
+
+    results, workers = sync.merged()
+
+    assert workers == 2
+    assert results["profiled_requests"] == 3
+    assert not stale.exists()
+    local.configure(enabled=False)
+    other.configure(enabled=False)
+
+
+def test_results_published_before_a_reset_are_left_out(tmp_path):
+    local = RequestProfiler(enabled=True)
+    sync = ProfilerStateSync(local, str(tmp_path))
+    other = RequestProfiler(enabled=True)
+    profile_request(other)
+    published = tmp_path / "worker-1.json"
+    sync._write(str(published), other.get_state())
+    before = time.time() - 1
+    os.utime(published, (before, before))
+
+    sync.save_settings(reset=True)
+    results, workers = sync.merged()
+
+    assert workers == 1
+    assert results["profiled_requests"] == 0
+    local.configure(enabled=False)
+    other.configure(enabled=False)
+
+
+def test_sync_thread_starts_once_per_process(tmp_path):
+    def sync_threads():
+        return [thread for thread in threading.enumerate() if thread.name == "profiler-sync"]
+
+    sync = ProfilerStateSync(RequestProfiler(), str(tmp_path), interval=60)
+    before = len(sync_threads())
+
+    sync.ensure_started()
+    sync.ensure_started()
+
+    assert len(sync_threads()) == before + 1
@@ -0,0 +1,134 @@
+import json
+import os
+from datetime import datetime, timedelta
+import joblib
+import numpy as np
+import pandas as pd
+import refresh_model
+from drift_monitor import build_reference_profile, save_reference_profile
+from refresh_model import MAX_HOLDOUT_AP_DROP, collect_labels, passes_holdout_gate, update_score_reference
+
+SINCE = datetime(2024, 1, 10)
+UNTIL = datetime(2024, 1, 20)
+IN_WINDOW = datetime(2024, 1, 15)
+BEFORE_WINDOW = datetime(2024, 1, 5)
+AFTER_WINDOW = datetime(2024, 1, 25)
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+
+def add_transaction(mongo, status, verified_at=None, amount=100.0, time=3600.0):
+    transaction = {"amount": amount, "time": time, "status": status}
+    if verified_at is not None:
+        transaction["verified_at"] = verified_at
+    return str(mongo.transactions.insert_one(transaction).inserted_id)
+
+
+def add_alert(mongo, transaction_id, status, verified_at=None):
+    alert = {"transaction_id": transaction_id, "status": status}
+    if verified_at is not None:
+        alert["verified_at"] = verified_at
+    mongo.fraud_alerts.insert_one(alert)
+
+
+def test_transaction_outcomes_become_labels(mongo):
+    add_transaction(mongo, "verified", IN_WINDOW, amount=1.0)
+    add_transaction(mongo, "approved", IN_WINDOW, amount=2.0)
+    add_transaction(mongo, "rejected", IN_WINDOW, amount=3.0)
+    add_transaction(mongo, "flagged", IN_WINDOW, amount=4.0)
+    add_transaction(mongo, "approved", amount=5.0)
+
+    labels = sorted(collect_labels(SINCE, UNTIL))
+
+    assert labels == [(1.0, 3600.0, 0), (2.0, 3600.0, 0), (3.0, 3600.0, 1)]
+
+
+def test_only_labels_inside_the_window_are_read(mongo):
+    add_transaction(mongo, "verified", BEFORE_WINDOW, amount=1.0)
+    add_transaction(mongo, "verified", SINCE, amount=2.0)
+    add_transaction(mongo, "verified", UNTIL, amount=3.0)
+    add_transaction(mongo, "verified", AFTER_WINDOW, amount=4.0)
+
+    assert [amount for amount, _, _ in collect_labels(SINCE, UNTIL)] == [3.0]
+
+
+def test_alert_review_overrides_otp_outcome(mongo):
+    tid = add_transaction(mongo, "verified", IN_WINDOW)
+    add_alert(mongo, tid, "resolved", IN_WINDOW + timedelta(hours=1))
+
+    assert collect_labels(SINCE, UNTIL) == [(100.0, 3600.0, 1)]
+
+
+def test_alert_reviewed_in_an_earlier_run_still_overrides(mongo):
+    # The analyst confirmed fraud last week; the OTP was verified afterwards
+    tid = add_transaction(mongo, "verified", IN_WINDOW)
+    add_alert(mongo, tid, "resolved", BEFORE_WINDOW)
+
+    assert collect_labels(SINCE, UNTIL) == [(100.0, 3600.0, 1)]
+
+
+def test_latest_alert_review_wins(mongo):
+    tid = add_transaction(mongo, "rejected", IN_WINDOW)
+    add_alert(mongo, tid, "resolved", BEFORE_WINDOW)
+    add_alert(mongo, tid, "false_positive", IN_WINDOW)
+
+    assert collect_labels(SINCE, UNTIL) == [(100.0, 3600.0, 0)]
+
+
+def test_alert_reviewed_in_window_labels_older_transaction(mongo):
+    tid = add_transaction(mongo, "flagged")
+    add_alert(mongo, tid, "resolved", IN_WINDOW)
+
+    assert collect_labels(SINCE, UNTIL) == [(100.0, 3600.0, 1)]
+
+
+def test_non_final_alert_statuses_carry_no_label(mongo):
+    verified = add_transaction(mongo, "verified", IN_WINDOW, amount=1.0)
+    add_alert(mongo, verified, "reviewed", IN_WINDOW)
+    flagged = add_transaction(mongo, "flagged", amount=2.0)
+    add_alert(mongo, flagged, "pending", IN_WINDOW)
+
+    assert collect_labels(SINCE, UNTIL) == [(1.0, 3600.0, 0)]
+
+
+def test_holdout_gate_is_measured_from_the_best_model():
+    best_ap = 0.80
+
+    assert passes_holdout_gate(0.80, best_ap)
+    assert passes_holdout_gate(best_ap - MAX_HOLDOUT_AP_DROP, best_ap)
+    # A second small drop after an accepted one is measured from the best, not the current model
+    assert not passes_holdout_gate(best_ap - 2 * MAX_HOLDOUT_AP_DROP, best_ap)
+
+
+def test_publishing_recomputes_the_score_reference_only(tmp_path, monkeypatch):
+    model = joblib.load(os.path.join(MODELS_DIR, "paywatch_model.pkl"))
+    scaler = joblib.load(os.path.join(MODELS_DIR, "scaler.pkl"))
+    rng = np.random.default_rng(0)
+
+    X_holdout = pd.DataFrame(rng.normal(size=(500, 30)), columns=model.get_booster().feature_names)
+    reference = build_reference_profile({
+        "Amount": rng.lognormal(3, 1, 500),
+        "Time": rng.uniform(0, 172800, 500),
+        "fraud_score": np.full(500, 0.9)
+    })
+    reference_path = tmp_path / "reference_profile.json"
+    save_reference_profile(reference, str(reference_path))
+    monkeypatch.setattr(refresh_model, "REFERENCE_PATH", str(reference_path))
+    monkeypatch.setattr(refresh_model, "PREVIOUS_REFERENCE_PATH", str(tmp_path / "reference_profile.prev.json"))
+
+    update_score_reference(model, scaler, X_holdout)
+
+    updated = json.loads(reference_path.read_text())
+    assert updated["features"]["Amount"] == json.loads(json.dumps(reference["features"]["Amount"]))
+    assert updated["features"]["fraud_score"] != json.loads(json.dumps(reference["features"]["fraud_score"]))
+    assert updated["features"]["fraud_score"]["count"] == 500
+    assert (tmp_path / "reference_profile.prev.json").exists()
+
+
+def test_missing_reference_profile_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(refresh_model, "REFERENCE_PATH", str(tmp_path / "missing.json"))
+
+    update_score_reference(None, None, None)
+
+    assert not (tmp_path / "missing.json").exists()
+
@@ -0,0 +1,123 @@
+import pytest
+from bson.objectid import ObjectId
+import app as service
+import database
+from config import Config
+from tokens import generate_token
+
+USER_ID = str(ObjectId())
+EMAIL = "user@example.com"
+OTP = "123456"
+
+
+@pytest.fixture
+def client(mongo, monkeypatch):
+    # OTPs are printed instead of emailed
+    monkeypatch.setattr(Config, "SMTP_USER", "")
+    return service.app.test_client()
+
+
+def auth(user_id=USER_ID, email=EMAIL):
+    return {"Authorization": f"Bearer {generate_token(user_id, email)}"}
+
+
+def flagged_transaction(mongo, user_id=USER_ID, otp=OTP, email=EMAIL):
+    """A flagged transaction with an OTP issued for it"""
+    tid = str(mongo.transactions.insert_one({
+        "user_id": user_id, "amount": 900.0, "time": 10.0, "status": "flagged", "verified": False
+    }).inserted_id)
+    if otp is not None:
+        database.create_otp(email, otp, tid)
+    return tid
+
+
+def verify(client, tid, otp=OTP, headers=None):
+    return client.post(f"/transactions/{tid}/verify-otp", json={"otp": otp},
+                       headers=auth() if headers is None else headers)
+
+
+def test_record_transaction_requires_a_token(client):
+    response = client.post("/transactions", json={"Amount": 10, "Time": 1})
+
+    assert response.status_code == 401
+
+
+@pytest.mark.skipif(service.model is None, reason="models/paywatch_model.pkl not loaded")
+def test_record_transaction_scores_with_the_shipped_model(client, mongo):
+    response = client.post("/transactions", json={"Amount": 10, "Time": 1}, headers=auth())
+
+    assert response.status_code == 201
+    body = response.get_json()
+    stored = mongo.transactions.find_one({"_id": ObjectId(body["transaction_id"])})
+    assert stored["user_id"] == USER_ID
+    assert stored["fraud_score"] == body["fraud_score"]
+
+
+def test_verify_requires_a_token(client, mongo):
+    tid = flagged_transaction(mongo)
+
+    assert verify(client, tid, headers={}).status_code == 401
+
+
+def test_verify_rejects_invalid_transaction_id_without_using_the_otp(client, mongo):
+    tid = flagged_transaction(mongo)
+
+    assert verify(client, "not-an-id").status_code == 400
+    assert verify(client, tid).status_code == 200
+
+
+def test_verify_unknown_transaction(client):
+    assert verify(client, str(ObjectId())).status_code == 404
+
+
+def test_verify_another_users_transaction(client, mongo):
+    tid = flagged_transaction(mongo, user_id=str(ObjectId()))
+
+    response = verify(client, tid)
+
+    assert response.status_code == 403
+    assert mongo.otps.find_one({"transaction_id": tid})["used"] is False
+
+
+def test_verify_transaction_that_is_not_flagged(client, mongo):
+    tid = flagged_transaction(mongo)
+    mongo.transactions.update_one({"_id": ObjectId(tid)}, {"$set": {"status": "approved"}})
+
+    assert verify(client, tid).status_code == 400
+
+
+def test_wrong_otp_is_rejected_and_the_right_one_still_works(client, mongo):
+    tid = flagged_transaction(mongo)
+
+    assert verify(client, tid, otp="000000").status_code == 400
+    assert verify(client, tid).status_code == 200
+
+
+def test_valid_otp_verifies_the_transaction_once(client, mongo):
+    tid = flagged_transaction(mongo)
+
+    response = verify(client, tid)
+
+    assert response.status_code == 200
+    assert response.get_json() == {"verified": True, "transaction_id": tid, "status": "verified"}
+    assert mongo.transactions.find_one({"_id": ObjectId(tid)})["status"] == "verified"
+    assert verify(client, tid).status_code == 400
+
+
+def test_otp_is_single_use_even_if_the_transaction_is_still_flagged(client, mongo):
+    tid = flagged_transaction(mongo)
+    assert database.verify_otp(EMAIL, OTP, tid)
+
+    response = verify(client, tid)
+
+    assert response.status_code == 400
+    assert response.get_json()["verified"] is False
+
+
+def test_otp_is_bound_to_its_transaction(client, mongo):
+    issued_for = flagged_transaction(mongo)
+    other = flagged_transaction(mongo, otp=None)
+
+    assert verify(client, other).status_code == 400
+    # Not used up by the attempt on the other transaction
+    assert verify(client, issued_for).status_code == 200
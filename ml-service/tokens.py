@@ -0,0 +1,25 @@
+import jwt
+from datetime import datetime, timedelta
+from config import Config
+
+def generate_token(user_id, email):
+    """Generate JWT token for user"""
+    payload = {
+        'user_id': str(user_id),
+        'email': email,
+        'exp': datetime.utcnow() + timedelta(hours=Config.JWT_EXPIRATION_HOURS),
+        'iat': datetime.utcnow()
+    }
+    
+    token = jwt.encode(payload, Config.JWT_SECRET, algorithm='HS256')
+    return token
+
+def decode_token(token):
+    """Decode and verify JWT token"""
+    try:
+        payload = jwt.decode(token, Config.JWT_SECRET, algorithms=['HS256'])
+        return payload
+    except jwt.ExpiredSignatureError:
+        return None
+    except jwt.InvalidTokenError:
+        return None
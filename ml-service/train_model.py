@@ -3,9 +3,12 @@ import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from xgboost import XGBClassifier
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
+from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, average_precision_score
 import joblib
+import json
 import os
+from drift_monitor import build_reference_profile, save_reference_profile
+from features import build_feature_frame
 
 print("🚀 Script started")  # debug print
 
@@ -20,6 +23,9 @@ X = df.drop("Class", axis=1)
 y = df["Class"]
 print("Columns in dataset:", list(df.columns))
 
+# Keep unscaled values for the drift reference profile
+raw_inputs = X[["Amount", "Time"]].copy()
+
 # 3️⃣ Scale numerical columns ('Amount' and 'Time')
 scaler = StandardScaler()
 X[["Amount", "Time"]] = scaler.fit_transform(X[["Amount", "Time"]])
@@ -63,5 +69,32 @@ scaler_path = os.path.join("models", "scaler.pkl")
 joblib.dump(scaler, scaler_path)
 print(f"💾 Scaler saved to: {scaler_path}")
 
+# Save the test split as the fixed holdout used to gate incremental refreshes
+holdout_path = os.path.join("models", "holdout.pkl")
+joblib.dump((X_test, y_test), holdout_path)
+print(f"💾 Holdout saved to: {holdout_path}")
+
+# A full retrain has not seen any verified labels, so reset the refresh watermark.
+# Its holdout AP is the baseline that later refreshes are gated against.
+holdout_ap = round(float(average_precision_score(y_test, model.predict_proba(X_test)[:, 1])), 4)
+with open(os.path.join("models", "refresh_state.json"), "w") as f:
+    json.dump({"watermark": None, "version": 0, "best_holdout_ap": holdout_ap}, f, indent=2)
+
+# 9️⃣ Save drift reference profile (unscaled inputs and scores on the test split).
+# The service only receives Amount and Time, so the reference scores are
+# computed from the same feature frame it builds, not from all 30 columns.
+reference_amounts = raw_inputs.loc[X_test.index, "Amount"].values
+reference_times = raw_inputs.loc[X_test.index, "Time"].values
+reference_profile = build_reference_profile({
+    "Amount": reference_amounts,
+    "Time": reference_times,
+    "fraud_score": model.predict_proba(
+        build_feature_frame(model, scaler, reference_amounts, reference_times)
+    )[:, 1]
+})
+reference_path = os.path.join("models", "reference_profile.json")
+save_reference_profile(reference_profile, reference_path)
+print(f"💾 Drift reference profile saved to: {reference_path}")
+
 print("🎉 Script finished successfully")
 